@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import functools
+import os
 from dataclasses import dataclass
 from typing import Any
 
@@ -17,16 +19,51 @@ class BranchSpecs:
     raw: dict[str, Any]
     confidence_thresholds: ConfidenceThresholds
 
+    @functools.cached_property
+    def flat(self) -> dict[tuple[Any, ...], Any]:
+        """raw 的扁平视图：键为逐级路径元组，值为该路径上的节点。
+
+        配置加载后不再修改，首次访问时展开一次，之后按路径一次查表。
+        """
+        flat: dict[tuple[Any, ...], Any] = {}
+        stack: list[tuple[tuple[Any, ...], dict[Any, Any]]] = [((), self.raw)]
+        while stack:
+            prefix, node = stack.pop()
+            for key, value in node.items():
+                path = prefix + (key,)
+                flat[path] = value
+                if isinstance(value, dict):
+                    stack.append((path, value))
+        return flat
+
+    def branch_enabled(self, branch: str) -> bool:
+        """分支总开关（缺省开启）；调用方应在生成前判断，关闭时跳过整条分支的工作。"""
+        branch_cfg = self.raw.get(branch) or {}
+        return bool(branch_cfg.get("enabled", True))
+
+
+# 优先使用 libyaml 的 C 实现，未编译时退回纯 Python 版本
+_YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+# 配置路径 -> (mtime, size, 解析结果)
+_specs_cache: dict[str, tuple[float, int, BranchSpecs]] = {}
+
 
 def load_branch_specs(file_path: str) -> BranchSpecs:
     """加载分支配置。
 
     只做最小结构化：把 gating.confidence_thresholds 抽出来。
     其余保持 raw 字典，便于后续快速加字段而不改代码。
+    文件 mtime 与 size 均未变化时直接复用上次解析结果。
     """
 
+    stat = os.stat(file_path)
+    cached = _specs_cache.get(file_path)
+    if cached is not None and cached[0] == stat.st_mtime and cached[1] == stat.st_size:
+        return cached[2]
+
     with open(file_path, "r", encoding="utf-8") as f:
-        raw = yaml.safe_load(f) or {}
+        raw = yaml.load(f, Loader=_YamlLoader) or {}
 
     gating = raw.get("gating") or {}
     thresholds = gating.get("confidence_thresholds") or {}
@@ -36,7 +73,9 @@ def load_branch_specs(file_path: str) -> BranchSpecs:
     if not (0.0 <= low <= 1.0 and 0.0 <= high <= 1.0 and low <= high):
         raise ValueError("branch_specs.yaml gating.confidence_thresholds 取值不合法")
 
-    return BranchSpecs(
+    specs = BranchSpecs(
         raw=raw,
         confidence_thresholds=ConfidenceThresholds(low=low, high=high),
     )
+    _specs_cache[file_path] = (stat.st_mtime, stat.st_size, specs)
+    return specs
@@ -10,9 +10,17 @@ def getRecentBriefRefIds(settings: Settings, kind: str, refIds: Iterable[int], h
 
     with get_conn(settings) as conn:
         with conn.cursor() as cur:
+            # UNNEST 连接候选 id，一次往返完成过滤；make_interval 免去字符串解析
+            # prepare=True 让同一连接上的重复调用复用执行计划
             cur.execute(
-                "SELECT ref_id FROM briefs WHERE kind = %s AND ref_id = ANY(%s) AND created_at > NOW() - (%s || ' hours')::interval",
-                (kind, refIdList, hours),
+                """
+                SELECT DISTINCT b.ref_id
+                FROM briefs b
+                JOIN UNNEST(%s::bigint[]) AS t(ref_id) USING (ref_id)
+                WHERE b.kind = %s AND b.created_at > NOW() - make_interval(hours => %s::int)
+                """,
+                (refIdList, kind, hours),
+                prepare=True,
             )
             rows = cur.fetchall()
-    return {int(r[0]) for r in rows if r and r[0] is not None}
+    return {int(r[0]) for r in rows}
@@ -1,123 +1,165 @@
 import concurrent.futures
 import datetime as dt
-import hashlib
+import functools
 import json
 import logging
 import os
-import random
 import re
-from typing import Dict, List, Optional
-from urllib.parse import urlsplit
+import string
+import zlib
+from collections import OrderedDict
+from typing import Dict, Iterator, List, Optional, Tuple, TypeVar
 
 import yaml
 from .llm import get_llm
 from ..config import Settings
 
-logger = logging.getLogger("briefing_generator")
-
-promptTemplatesCache = None
-promptTemplatesMtime = None
+try:
+    import orjson
+except ImportError:  # orjson 为可选依赖，缺失时退回标准库
+    orjson = None
 
-def loadPromptTemplates(settings: Settings) -> Dict:
-    global promptTemplatesCache
-    global promptTemplatesMtime
+logger = logging.getLogger("briefing_generator")
 
+T = TypeVar("T")
+
+_json_loads = orjson.loads if orjson is not None else json.loads
+# 优先使用 libyaml 的 C 实现，未编译时退回纯 Python 版本
+_YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+_FENCE_RE = re.compile(r"^```(?:json)?\s*|\s*```$", re.IGNORECASE)
+_JSON_OBJECT_RE = re.compile(r"\{.*\}", re.DOTALL)
+_PARAGRAPH_SPLIT_RE = re.compile(r"\n\s*\n")
+_BLOCK_DOMAINS = frozenset({"arxiv.org"})
+ITEMS_TEXT_MAX_ITEMS = 5
+ITEMS_TEXT_TITLE_MAX_LEN = 200
+ITEMS_TEXT_CACHE_SIZE = 256
+
+# 聚类 id -> (items 列表, 文本)；branch1/branch2 处理同一批聚类时直接复用
+itemsTextCache: Dict[object, Tuple[List[Dict], str]] = {}
+
+PROMPT_TEMPLATE_KEYS = {
+    "repo": "repo_template",
+    "news": "news_template",
+    "repo_b2": "repo_template_branch2",
+    "news_b2": "news_template_branch2",
+}
+PROMPT_TEMPLATES_CACHE_SIZE = 4
+EMPTY_PROMPT_TEMPLATES: Dict[str, str] = {name: "" for name in PROMPT_TEMPLATE_KEYS}
+
+# 模板路径 -> (mtime, size, 原始配置, 预解析模板)
+promptTemplatesCache: "OrderedDict[str, Tuple[float, int, Dict, Dict[str, str]]]" = OrderedDict()
+
+def _loadPromptTemplateEntry(settings: Settings) -> Tuple[Dict, Dict[str, str]]:
     templatePath = settings.prompt_templates_file
-    if not templatePath or not os.path.exists(templatePath):
-        return {}
+    if not templatePath:
+        return {}, EMPTY_PROMPT_TEMPLATES
+    try:
+        stat = os.stat(templatePath)
+    except OSError:
+        return {}, EMPTY_PROMPT_TEMPLATES
 
-    mtime = os.path.getmtime(templatePath)
-    if promptTemplatesCache is not None and promptTemplatesMtime == mtime:
-        return promptTemplatesCache
+    # mtime + size 同时比对，避免同一秒内修改被漏掉
+    cached = promptTemplatesCache.get(templatePath)
+    if cached is not None and cached[0] == stat.st_mtime and cached[1] == stat.st_size:
+        promptTemplatesCache.move_to_end(templatePath)
+        return cached[2], cached[3]
 
     try:
         with open(templatePath, "r", encoding="utf-8") as f:
-            data = yaml.safe_load(f) or {}
+            data = yaml.load(f, Loader=_YamlLoader) or {}
     except Exception as e:
         logger.error(f"读取模板失败: {e}")
-        return {}
+        return {}, EMPTY_PROMPT_TEMPLATES
+
+    if isinstance(data, dict):
+        resolved = {name: data.get(key) or "" for name, key in PROMPT_TEMPLATE_KEYS.items()}
+    else:
+        resolved = EMPTY_PROMPT_TEMPLATES
+    promptTemplatesCache[templatePath] = (stat.st_mtime, stat.st_size, data, resolved)
+    promptTemplatesCache.move_to_end(templatePath)
+    while len(promptTemplatesCache) > PROMPT_TEMPLATES_CACHE_SIZE:
+        promptTemplatesCache.popitem(last=False)
+    return data, resolved
 
-    promptTemplatesCache = data
-    promptTemplatesMtime = mtime
-    return data
+def loadPromptTemplates(settings: Settings) -> Dict:
+    return _loadPromptTemplateEntry(settings)[0]
 
 def getRepoPromptTemplate(settings: Settings) -> str:
-    templates = loadPromptTemplates(settings)
-    template = templates.get("repo_template") if isinstance(templates, dict) else None
-    return template or ""
+    return _loadPromptTemplateEntry(settings)[1]["repo"]
 
 def getNewsPromptTemplate(settings: Settings) -> str:
-    templates = loadPromptTemplates(settings)
-    template = templates.get("news_template") if isinstance(templates, dict) else None
-    return template or ""
+    return _loadPromptTemplateEntry(settings)[1]["news"]
 
 def getNewsPromptTemplateBranch2(settings: Settings) -> str:
-    templates = loadPromptTemplates(settings)
-    template = templates.get("news_template_branch2") if isinstance(templates, dict) else None
-    return template or ""
+    return _loadPromptTemplateEntry(settings)[1]["news_b2"]
 
 def getRepoPromptTemplateBranch2(settings: Settings) -> str:
-    templates = loadPromptTemplates(settings)
-    template = templates.get("repo_template_branch2") if isinstance(templates, dict) else None
-    return template or ""
+    return _loadPromptTemplateEntry(settings)[1]["repo_b2"]
 
-def _run_parallel(items: List[Dict], fn, max_workers: int) -> List[Optional[Dict]]:
+def _run_parallel_streaming(items: List[T], fn, max_workers: int) -> Iterator[Tuple[int, Optional[Dict]]]:
+    """按完成顺序产出 (下标, 结果)，慢任务不阻塞已完成结果的处理。"""
     if max_workers <= 1:
-        return [fn(item) for item in items]
-    results: List[Optional[Dict]] = [None] * len(items)
-    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for idx, item in enumerate(items):
+            yield idx, fn(item)
+        return
+    if not items:
+        return
+    # 线程数不超过任务数，避免为小批量空开线程
+    worker_count = min(max_workers, len(items))
+    with concurrent.futures.ThreadPoolExecutor(max_workers=worker_count) as executor:
         future_to_idx = {executor.submit(fn, item): idx for idx, item in enumerate(items)}
         for future in concurrent.futures.as_completed(future_to_idx):
             idx = future_to_idx[future]
             try:
-                results[idx] = future.result()
+                result = future.result()
             except Exception:
-                results[idx] = None
+                result = None
+            yield idx, result
+
+def _run_parallel(items: List[T], fn, max_workers: int) -> List[Optional[Dict]]:
+    results: List[Optional[Dict]] = [None] * len(items)
+    for idx, result in _run_parallel_streaming(items, fn, max_workers):
+        results[idx] = result
     return results
 
+def _generate_unique(llm, prompts: List[str], max_workers: int) -> Dict[str, Optional[str]]:
+    """同一批次内相同 prompt 只请求一次，失败的 prompt 对应 None。"""
+    unique_prompts = list(dict.fromkeys(prompts))
+    if len(unique_prompts) < len(prompts):
+        logger.info(f"批次内重复 prompt 合并: {len(prompts)} -> {len(unique_prompts)}")
+
+    def _call(prompt: str) -> Optional[str]:
+        try:
+            return llm.generate(prompt)
+        except Exception:
+            return None
+
+    responses = _run_parallel(unique_prompts, _call, max_workers)
+    return dict(zip(unique_prompts, responses))
+
 def _extract_json(text: str) -> Dict:
     if not text:
         raise ValueError("Empty LLM response")
-    cleaned = text.strip()
-    if cleaned.startswith("```"):
-        cleaned = cleaned.strip("`")
-        cleaned = cleaned.replace("json", "", 1).strip()
-    start = cleaned.find("{")
-    end = cleaned.rfind("}")
-    if start != -1 and end != -1:
-        cleaned = cleaned[start:end + 1]
-    return json.loads(cleaned)
-
-def _normalize_list(value) -> List[str]:
-    if isinstance(value, list):
-        return [str(v).strip() for v in value if str(v).strip()]
-    if isinstance(value, str):
-        v = value.strip()
-        return [v] if v else []
-    return []
-
-def _normalize_tags(value) -> List[str]:
-    if isinstance(value, list):
-        return [str(v).strip() for v in value if str(v).strip()]
-    if isinstance(value, str):
-        v = value.strip()
-        return [v] if v else []
-    return []
+    cleaned = _FENCE_RE.sub("", text.strip())
+    match = _JSON_OBJECT_RE.search(cleaned)
+    return _json_loads(match.group(0) if match else cleaned)
 
-
-def _normalize_paragraphs(value) -> List[str]:
+def _normalize(value, *, split_paragraphs: bool = False) -> List[str]:
+    """列表逐项去空白；字符串视为单项，或按空行拆成段落。"""
     if isinstance(value, list):
-        return [str(v).strip() for v in value if str(v).strip()]
+        return [s for s in (str(v).strip() for v in value) if s]
     if isinstance(value, str):
         text = value.strip()
         if not text:
             return []
-        parts = re.split(r"\n\s*\n", text)
-        return [p.strip() for p in parts if p.strip()]
+        if not split_paragraphs:
+            return [text]
+        return [s for s in (p.strip() for p in _PARAGRAPH_SPLIT_RE.split(text)) if s]
     return []
 
 
 def _should_discard(parsed: Dict) -> bool:
+    """按开销从低到高检查；规范化结果只用于判断，不改写 parsed（其内容原样入库）。"""
     if not isinstance(parsed, dict):
         return True
     value = parsed.get("discard")
@@ -125,42 +167,105 @@ def _should_discard(parsed: Dict) -> bool:
         return value
     if isinstance(value, str):
         return value.strip().lower() in ("true", "1", "yes")
-    summary = str(parsed.get("summary") or "").strip()
-    body = _normalize_paragraphs(parsed.get("body"))
-    points = _normalize_list(parsed.get("points"))
-    if len(summary) < 60:
+    if len(str(parsed.get("summary") or "").strip()) < 60:
         return True
-    if len(body) < 4:
+    if len(_normalize(parsed.get("points"))) < 3:
         return True
-    if len(points) < 3:
+    if len(_normalize(parsed.get("body"), split_paragraphs=True)) < 4:
         return True
     return False
 
+BRIEF_LIST_FIELDS = ("why_matters", "key_features", "tags")
+
+def _finalize_brief(parsed: Dict, url: str, one_liner_fallback: str) -> Dict:
+    """一次遍历完成 branch1 简报字段规范化，原地修改并返回。"""
+    parsed["one_liner"] = parsed.get("one_liner") or one_liner_fallback
+    for field in BRIEF_LIST_FIELDS:
+        parsed[field] = _normalize(parsed.get(field))
+    parsed["url"] = url
+    return parsed
+
 def _build_items_text(items: List[Dict]) -> str:
-    parts: List[str] = []
-    for idx, item in enumerate(items[:5]):
-        title = item.get("title", "")
-        source = item.get("source", "")
-        parts.append(f"{idx+1}. {title} (Source: {source})")
-    return "\n".join(parts)
+    # 标题截断，避免个别超长标题挤占 token 预算
+    return "\n".join([
+        f"{idx + 1}. {str(item.get('title', ''))[:ITEMS_TEXT_TITLE_MAX_LEN]} (Source: {item.get('source', '')})"
+        for idx, item in enumerate(items[:ITEMS_TEXT_MAX_ITEMS])
+    ])
+
+def _get_cluster_items_text(cluster: Dict) -> str:
+    items = cluster.get("items", [])
+    key = cluster.get("id")
+    if key is None:
+        return _build_items_text(items)
+    # 同一 items 对象才复用，聚类内容变化时自动重建
+    cached = itemsTextCache.get(key)
+    if cached is not None and cached[0] is items:
+        return cached[1]
+    text = _build_items_text(items)
+    if len(itemsTextCache) >= ITEMS_TEXT_CACHE_SIZE:
+        itemsTextCache.clear()
+    itemsTextCache[key] = (items, text)
+    return text
+
+@functools.lru_cache(maxsize=32)
+def _compileTemplate(template: str) -> Optional[Tuple[Tuple[str, Optional[str]], ...]]:
+    """把模板预拆成 (字面量, 字段名) 片段；含格式说明、下标等复杂占位符时返回 None。"""
+    segments: List[Tuple[str, Optional[str]]] = []
+    try:
+        for literal, field, spec, conversion in string.Formatter().parse(template):
+            if field is not None and (spec or conversion or not field.isidentifier()):
+                return None
+            segments.append((literal, field))
+    except ValueError:
+        return None
+    return tuple(segments)
 
 def buildPromptFromTemplate(template: str, values: Dict) -> str:
     if not template:
         return ""
-    try:
-        return template.format_map(values)
-    except KeyError as e:
-        logger.error(f"模板缺少占位符: {e}")
-        return ""
+    compiled = _compileTemplate(template)
+    if compiled is None:
+        try:
+            return template.format_map(values)
+        except KeyError as e:
+            logger.error(f"模板缺少占位符: {e}")
+            return ""
+
+    parts: List[str] = []
+    for literal, field in compiled:
+        parts.append(literal)
+        if field is None:
+            continue
+        if field not in values:
+            logger.error(f"模板缺少占位符: {field!r}")
+            return ""
+        parts.append(str(values[field]))
+    return "".join(parts)
 
 def _get_domain(url: str) -> str:
+    # 只取主机名，不走完整的 urlsplit 解析
     if not url:
         return ""
-    try:
-        parts = urlsplit(url)
-    except Exception:
+    idx = url.find("://")
+    if idx < 0:
         return ""
-    return parts.netloc.lower() if parts.netloc else ""
+    start = idx + 3
+    end = len(url)
+    for sep in "/?#":
+        pos = url.find(sep, start, end)
+        if pos >= 0:
+            end = pos
+    host = url[start:end]
+    at = host.rfind("@")
+    if at >= 0:
+        host = host[at + 1:]
+    if host.startswith("["):
+        close = host.find("]")
+        return host[:close + 1].lower() if close >= 0 else host.lower()
+    colon = host.find(":")
+    if colon >= 0:
+        host = host[:colon]
+    return host.lower()
 
 def _select_cluster_url(cluster: Dict) -> str:
     primary_link = cluster.get("primary_link")
@@ -177,20 +282,18 @@ def _select_cluster_url(cluster: Dict) -> str:
     if not items:
         return ""
 
-    urls = [item.get("url", "") for item in items if item.get("url")]
+    urls = tuple(item.get("url", "") for item in items if item.get("url"))
     if not urls:
         return ""
 
-    block_domains = {"arxiv.org"}
-    non_blocked = [u for u in urls if _get_domain(u) not in block_domains]
-
     seed_source = str(cluster.get("id") or cluster.get("title") or "")
-    seed = int(hashlib.md5(seed_source.encode("utf-8")).hexdigest(), 16)
-    rng = random.Random(seed)
+    return _pick_cluster_url(seed_source, urls)
 
-    if non_blocked:
-        return rng.choice(non_blocked)
-    return rng.choice(urls)
+@functools.lru_cache(maxsize=1024)
+def _pick_cluster_url(seed_source: str, urls: Tuple[str, ...]) -> str:
+    # 同一聚类在 branch1/branch2 中重复调用，结果可复现即可，无需加密哈希
+    candidates = [u for u in urls if _get_domain(u) not in _BLOCK_DOMAINS] or urls
+    return candidates[zlib.crc32(seed_source.encode("utf-8")) % len(candidates)]
 
 def generate_repo_brief(settings: Settings, repo: Dict) -> Dict:
     """
@@ -272,12 +375,7 @@ def generate_repo_brief(settings: Settings, repo: Dict) -> Dict:
     try:
         response_text = llm.generate(prompt)
         parsed = _extract_json(response_text)
-        parsed['one_liner'] = parsed.get('one_liner') or repo.get('description') or repo.get('full_name')
-        parsed['why_matters'] = _normalize_list(parsed.get('why_matters'))
-        parsed['key_features'] = _normalize_list(parsed.get('key_features'))
-        parsed['tags'] = _normalize_tags(parsed.get('tags'))
-        parsed['url'] = repo['url']
-        return parsed
+        return _finalize_brief(parsed, repo['url'], repo.get('description') or repo.get('full_name'))
     except Exception as e:
         # LLM 失败时的兜底内容
         description = repo.get('description') or repo.get('full_name') or ""
@@ -296,7 +394,7 @@ def generate_news_brief(settings: Settings, cluster: Dict) -> Dict:
     llm = get_llm(settings, "report")
     
     # 聚类条目列表：{title, url, source, content_snippet}
-    items_text = _build_items_text(cluster.get('items', []))
+    items_text = _get_cluster_items_text(cluster)
     
     defaultPrompt = f"""
     你是一位擅长解读 AI 产品和技术趋势的科技解说员。
@@ -352,13 +450,8 @@ def generate_news_brief(settings: Settings, cluster: Dict) -> Dict:
     try:
         response_text = llm.generate(prompt)
         parsed = _extract_json(response_text)
-        parsed['one_liner'] = parsed.get('one_liner') or cluster.get('title', 'News Update')
-        parsed['why_matters'] = _normalize_list(parsed.get('why_matters'))
-        parsed['key_features'] = _normalize_list(parsed.get('key_features'))
-        parsed['tags'] = _normalize_tags(parsed.get('tags'))
         # 使用可复现随机选择的主链接（优先非 arxiv）
-        parsed['url'] = _select_cluster_url(cluster)
-        return parsed
+        return _finalize_brief(parsed, _select_cluster_url(cluster), cluster.get('title', 'News Update'))
     except Exception as e:
         items = cluster.get('items', [])
         fallback_title = cluster.get('title', '')
@@ -372,23 +465,33 @@ def generate_news_brief(settings: Settings, cluster: Dict) -> Dict:
             "url": ""
         }
 
+def _build_brief_record(source_id: int, source_type: str, content: Dict, created_at: Optional[dt.datetime] = None) -> Dict:
+    return {
+        "source_id": source_id,
+        "source_type": source_type,
+        "content": content,
+        "created_at": created_at,
+    }
+
+def _stamp_created_at(slots: List[Optional[Dict]]) -> List[Dict]:
+    # 全部生成完成后取一次时间，同一批次共用，与 Branch2 在同一时点打戳
+    created_at = dt.datetime.now(dt.timezone.utc)
+    briefs = [b for b in slots if b]
+    for brief in briefs:
+        brief["created_at"] = created_at
+    return briefs
+
 def generate_repo_briefs(settings: Settings, repos: List[Dict]) -> List[Dict]:
     for repo in repos:
         repo_name = repo.get('full_name') or repo.get('url') or "unknown"
         logger.info(f"生成 Repo 简报: {repo_name}")
 
-    contents = _run_parallel(repos, lambda r: generate_repo_brief(settings, r), settings.llm_max_workers)
-    briefs = []
-    for repo, content in zip(repos, contents):
-        if not content:
-            continue
-        briefs.append({
-            "source_id": repo['id'],
-            "source_type": "repo",
-            "content": content,
-            "created_at": dt.datetime.now(dt.timezone.utc)
-        })
-    return briefs
+    # 完成一条组装一条，最终仍按排序顺序返回
+    slots: List[Optional[Dict]] = [None] * len(repos)
+    for idx, content in _run_parallel_streaming(repos, lambda r: generate_repo_brief(settings, r), settings.llm_max_workers):
+        if content:
+            slots[idx] = _build_brief_record(repos[idx]['id'], "repo", content)
+    return _stamp_created_at(slots)
 
 def generate_repo_briefs_branch2(settings: Settings, repos: List[Dict]) -> List[Dict]:
     template = getRepoPromptTemplateBranch2(settings)
@@ -397,7 +500,9 @@ def generate_repo_briefs_branch2(settings: Settings, repos: List[Dict]) -> List[
     llm = get_llm(settings, "wechat")
     max_workers = max(1, settings.llm_max_workers)
 
-    def _gen(repo: Dict) -> Optional[Dict]:
+    # 在主线程里先拼好 prompt，工作线程只负责网络调用
+    prepared: List[Tuple[Dict, str]] = []
+    for repo in repos:
         prompt = buildPromptFromTemplate(template, {
             "repo_full_name": repo.get("full_name", ""),
             "repo_url": repo.get("url", ""),
@@ -405,10 +510,19 @@ def generate_repo_briefs_branch2(settings: Settings, repos: List[Dict]) -> List[
             "repo_topics": ", ".join(repo.get("topics", []) or []),
             "repo_language": repo.get("language", ""),
         })
-        if not prompt:
+        if prompt:
+            prepared.append((repo, prompt))
+
+    responses = _generate_unique(llm, [prompt for _, prompt in prepared], max_workers)
+    created_at = dt.datetime.now(dt.timezone.utc)
+
+    def _gen(task: Tuple[Dict, str]) -> Optional[Dict]:
+        repo, prompt = task
+        response_text = responses.get(prompt)
+        if not response_text:
             return None
         try:
-            response_text = llm.generate(prompt)
+            # 每条各自解析，重复 prompt 共享响应但不共享 dict
             parsed = _extract_json(response_text)
             if _should_discard(parsed):
                 reason = parsed.get("reason") if isinstance(parsed, dict) else ""
@@ -416,16 +530,11 @@ def generate_repo_briefs_branch2(settings: Settings, repos: List[Dict]) -> List[
                 logger.info(f"Branch2 丢弃 repo: {repo_name} ({str(reason).strip()})")
                 return None
             parsed["url"] = repo.get("url", "")
-            return {
-                "source_id": repo["id"],
-                "source_type": "repo",
-                "content": parsed,
-                "created_at": dt.datetime.now(dt.timezone.utc)
-            }
+            return _build_brief_record(repo["id"], "repo", parsed, created_at)
         except Exception:
             return None
 
-    contents = _run_parallel(repos, _gen, max_workers)
+    contents = [_gen(task) for task in prepared]
     return [c for c in contents if c]
 
 def generate_news_briefs(settings: Settings, clusters: List[Dict]) -> List[Dict]:
@@ -433,18 +542,12 @@ def generate_news_briefs(settings: Settings, clusters: List[Dict]) -> List[Dict]
         cluster_title = cluster.get('title') or cluster.get('id') or "unknown"
         logger.info(f"生成新闻简报: {cluster_title}")
 
-    contents = _run_parallel(clusters, lambda c: generate_news_brief(settings, c), settings.llm_max_workers)
-    briefs = []
-    for cluster, content in zip(clusters, contents):
-        if not content:
-            continue
-        briefs.append({
-            "source_id": cluster['id'],
-            "source_type": "news",
-            "content": content,
-            "created_at": dt.datetime.now(dt.timezone.utc)
-        })
-    return briefs
+    # 完成一条组装一条，最终仍按排序顺序返回
+    slots: List[Optional[Dict]] = [None] * len(clusters)
+    for idx, content in _run_parallel_streaming(clusters, lambda c: generate_news_brief(settings, c), settings.llm_max_workers):
+        if content:
+            slots[idx] = _build_brief_record(clusters[idx]['id'], "news", content)
+    return _stamp_created_at(slots)
 
 def generate_news_briefs_branch2(settings: Settings, clusters: List[Dict]) -> List[Dict]:
     template = getNewsPromptTemplateBranch2(settings)
@@ -453,16 +556,26 @@ def generate_news_briefs_branch2(settings: Settings, clusters: List[Dict]) -> Li
     llm = get_llm(settings, "wechat")
     max_workers = max(1, settings.llm_max_workers)
 
-    def _gen(cluster: Dict) -> Optional[Dict]:
-        items_text = _build_items_text(cluster.get("items", []))
+    # 在主线程里先拼好 prompt，工作线程只负责网络调用
+    prepared: List[Tuple[Dict, str]] = []
+    for cluster in clusters:
         prompt = buildPromptFromTemplate(template, {
-            "items_text": items_text,
+            "items_text": _get_cluster_items_text(cluster),
             "cluster_title": cluster.get("title", ""),
         })
-        if not prompt:
+        if prompt:
+            prepared.append((cluster, prompt))
+
+    responses = _generate_unique(llm, [prompt for _, prompt in prepared], max_workers)
+    created_at = dt.datetime.now(dt.timezone.utc)
+
+    def _gen(task: Tuple[Dict, str]) -> Optional[Dict]:
+        cluster, prompt = task
+        response_text = responses.get(prompt)
+        if not response_text:
             return None
         try:
-            response_text = llm.generate(prompt)
+            # 每条各自解析，重复 prompt 共享响应但不共享 dict
             parsed = _extract_json(response_text)
             if _should_discard(parsed):
                 reason = parsed.get("reason") if isinstance(parsed, dict) else ""
@@ -470,14 +583,9 @@ def generate_news_briefs_branch2(settings: Settings, clusters: List[Dict]) -> Li
                 logger.info(f"Branch2 丢弃 news: {title} ({str(reason).strip()})")
                 return None
             parsed["url"] = _select_cluster_url(cluster)
-            return {
-                "source_id": cluster["id"],
-                "source_type": "news",
-                "content": parsed,
-                "created_at": dt.datetime.now(dt.timezone.utc)
-            }
+            return _build_brief_record(cluster["id"], "news", parsed, created_at)
         except Exception:
             return None
 
-    contents = _run_parallel(clusters, _gen, max_workers)
+    contents = [_gen(task) for task in prepared]
     return [c for c in contents if c]
@@ -1,12 +1,209 @@
 from abc import ABC, abstractmethod
+from collections import OrderedDict
+import functools
+import hashlib
+import logging
+import sqlite3
+import threading
 import time
-from abc import ABC, abstractmethod
 
 import requests
+from requests.adapters import HTTPAdapter
 
 from ..config import Settings
 
-promptCache: dict[str, str] = {}
+logger = logging.getLogger("llm")
+
+
+class PromptCache:
+    """LLM 响应缓存：进程内有界 LRU，可选 SQLite 持久化以便重启后复用。"""
+
+    def __init__(self, max_size: int, file_path: str | None = None):
+        self.max_size = max(1, max_size)
+        self._entries: OrderedDict[bytes, str] = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: sqlite3.Connection | None = None
+        if file_path:
+            try:
+                self._db = sqlite3.connect(file_path, check_same_thread=False)
+                self._db.execute("CREATE TABLE IF NOT EXISTS prompt_cache (key BLOB PRIMARY KEY, value TEXT NOT NULL)")
+                self._db.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"LLM 缓存文件不可用，仅使用内存缓存: {e}")
+                self._db = None
+
+    def _remember(self, key: bytes, value: str) -> None:
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def get(self, key: bytes) -> str | None:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                return value
+            if self._db is None:
+                return None
+            try:
+                row = self._db.execute("SELECT value FROM prompt_cache WHERE key = ?", (key,)).fetchone()
+            except sqlite3.Error as e:
+                logger.warning(f"读取 LLM 缓存失败: {e}")
+                return None
+            if row is None:
+                return None
+            self._remember(key, row[0])
+            return row[0]
+
+    def set(self, key: bytes, value: str) -> None:
+        with self._lock:
+            self._remember(key, value)
+            if self._db is None:
+                return
+            try:
+                self._db.execute("INSERT OR REPLACE INTO prompt_cache (key, value) VALUES (?, ?)", (key, value))
+                self._db.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"写入 LLM 缓存失败: {e}")
+
+
+promptCache: PromptCache | None = None
+promptCacheLock = threading.Lock()
+
+def _get_prompt_cache(settings: Settings) -> PromptCache | None:
+    global promptCache
+    if not settings.llm_cache_enabled:
+        return None
+    if promptCache is None:
+        with promptCacheLock:
+            if promptCache is None:
+                promptCache = PromptCache(settings.llm_cache_max_size, settings.llm_cache_file)
+    return promptCache
+
+def _prompt_cache_key(provider: str, model: str, prompt: str) -> bytes:
+    # 用定长摘要做键，避免长 prompt 直接参与哈希与比较
+    return hashlib.blake2b(f"{provider}::{model}::{prompt}".encode("utf-8"), digest_size=16).digest()
+
+
+class RateLimiter:
+    """令牌桶限速 + AIMD：遇到 429 速率减半，之后每次成功加 1 RPM，直到配置上限。"""
+
+    def __init__(self, max_rpm: int, burst: int):
+        self.max_rate = max_rpm / 60.0
+        self.min_rate = min(self.max_rate, 1 / 60.0)
+        self.rate = self.max_rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._cond = threading.Condition()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(float(self.burst), self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self) -> None:
+        with self._cond:
+            while True:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                # 等待期间释放锁，其他线程可继续更新速率
+                self._cond.wait((1 - self._tokens) / self.rate)
+
+    def on_success(self) -> None:
+        with self._cond:
+            self._refill()
+            self.rate = min(self.max_rate, self.rate + 1 / 60.0)
+
+    def on_throttled(self) -> None:
+        with self._cond:
+            self._refill()
+            self.rate = max(self.min_rate, self.rate / 2)
+
+
+rateLimiters: dict[str, RateLimiter] = {}
+rateLimitersLock = threading.Lock()
+
+def _get_rate_limiter(settings: Settings, base_url: str) -> RateLimiter | None:
+    if settings.llm_rate_limit_rpm <= 0:
+        return None
+    with rateLimitersLock:
+        limiter = rateLimiters.get(base_url)
+        if limiter is None:
+            limiter = RateLimiter(settings.llm_rate_limit_rpm, settings.llm_max_workers)
+            rateLimiters[base_url] = limiter
+        return limiter
+
+
+def _get_status_code(error: Exception) -> int | None:
+    response = getattr(error, "response", None)
+    return getattr(response, "status_code", None) if response is not None else None
+
+
+def _is_retryable(status: int | None) -> bool:
+    # 429 与 5xx 可重试；其余 4xx（鉴权、参数错误）重试无意义
+    if status is None:
+        return True
+    return status == 429 or status >= 500
+
+
+def _request_completion(
+    settings: Settings,
+    session: requests.Session,
+    provider_name: str,
+    url: str,
+    headers: dict[str, str],
+    payload: dict[str, object],
+) -> str:
+    limiter = _get_rate_limiter(settings, url)
+    retryMax = max(0, settings.llm_retry_max)
+    backoffSeconds = max(1, settings.llm_retry_backoff_seconds)
+    lastError = None
+
+    for attempt in range(retryMax + 1):
+        r = None
+        if limiter is not None:
+            limiter.acquire()
+        try:
+            # 使用可配置超时，避免卡住
+            r = session.post(url, json=payload, headers=headers, timeout=settings.llm_timeout_seconds)
+            r.raise_for_status()
+            data = r.json()
+            content = data["choices"][0]["message"]["content"]
+            if limiter is not None:
+                limiter.on_success()
+            return content
+        except Exception as e:
+            lastError = e
+            status = _get_status_code(e)
+            logger.warning(f"{provider_name} API Error (attempt {attempt + 1}/{retryMax + 1}): {e}")
+            # 仅在调试级别才解码响应体
+            if r is not None and logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"Response Body: {r.text}")
+            if not _is_retryable(status):
+                break
+            if status == 429 and limiter is not None:
+                # 由令牌桶降速，不再额外盲目退避
+                limiter.on_throttled()
+                continue
+            if attempt < retryMax:
+                time.sleep(backoffSeconds * (2 ** attempt))
+
+    if lastError:
+        raise lastError
+    raise RuntimeError("LLM request failed")
+
+def _build_session(settings: Settings) -> requests.Session:
+    # 复用连接池，避免并发调用时每次重新握手
+    pool_size = max(1, settings.llm_max_workers)
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
 
 class LLM(ABC):
     @abstractmethod
@@ -19,6 +216,7 @@ class GLMProvider(LLM):
         self.key = settings.glm_api_key
         self.base = settings.glm_base_url.rstrip("/") if settings.glm_base_url else None
         self.model = model_override
+        self._session = _build_session(settings)
 
     def generate(self, prompt: str) -> str:
         if not self.key or not self.base or not self.model:
@@ -37,36 +235,17 @@ class GLMProvider(LLM):
         if self.settings.glm_enable_thinking:
             payload["thinking"] = {"type": "enabled"}
         
-        cache_key = f"glm::{self.model}::{prompt}"
-        if self.settings.llm_cache_enabled and cache_key in promptCache:
-            return promptCache[cache_key]
+        cache = _get_prompt_cache(self.settings)
+        cache_key = _prompt_cache_key("glm", self.model, prompt)
+        if cache is not None:
+            cached = cache.get(cache_key)
+            if cached is not None:
+                return cached
 
-        retryMax = max(0, self.settings.llm_retry_max)
-        backoffSeconds = max(1, self.settings.llm_retry_backoff_seconds)
-        lastError = None
-
-        for attempt in range(retryMax + 1):
-            r = None
-            try:
-                # 使用可配置超时，避免卡住
-                r = requests.post(url, json=payload, headers=headers, timeout=self.settings.llm_timeout_seconds)
-                r.raise_for_status()
-                data = r.json()
-                content = data["choices"][0]["message"]["content"]
-                if self.settings.llm_cache_enabled:
-                    promptCache[cache_key] = content
-                return content
-            except Exception as e:
-                lastError = e
-                print(f"GLM API Error: {e}")
-                if r is not None:
-                    print(f"Response Body: {r.text}")
-                if attempt < retryMax:
-                    time.sleep(backoffSeconds * (2 ** attempt))
-
-        if lastError:
-            raise lastError
-        raise RuntimeError("LLM request failed")
+        content = _request_completion(self.settings, self._session, "GLM", url, headers, payload)
+        if cache is not None:
+            cache.set(cache_key, content)
+        return content
 
 
 class OpenAICompatibleProvider(LLM):
@@ -83,6 +262,7 @@ class OpenAICompatibleProvider(LLM):
         self.api_key = api_key
         self.base = base_url.rstrip("/") if base_url else None
         self.provider_name = provider_name
+        self._session = _build_session(settings)
 
     def generate(self, prompt: str) -> str:
         if not self.api_key or not self.base or not self.model:
@@ -96,35 +276,17 @@ class OpenAICompatibleProvider(LLM):
             "temperature": 0.2,
         }
 
-        cache_key = f"{self.provider_name}::{self.model}::{prompt}"
-        if self.settings.llm_cache_enabled and cache_key in promptCache:
-            return promptCache[cache_key]
+        cache = _get_prompt_cache(self.settings)
+        cache_key = _prompt_cache_key(self.provider_name, self.model, prompt)
+        if cache is not None:
+            cached = cache.get(cache_key)
+            if cached is not None:
+                return cached
 
-        retryMax = max(0, self.settings.llm_retry_max)
-        backoffSeconds = max(1, self.settings.llm_retry_backoff_seconds)
-        lastError = None
-
-        for attempt in range(retryMax + 1):
-            r = None
-            try:
-                r = requests.post(url, json=payload, headers=headers, timeout=self.settings.llm_timeout_seconds)
-                r.raise_for_status()
-                data = r.json()
-                content = data["choices"][0]["message"]["content"]
-                if self.settings.llm_cache_enabled:
-                    promptCache[cache_key] = content
-                return content
-            except Exception as e:
-                lastError = e
-                print(f"{self.provider_name} API Error: {e}")
-                if r is not None:
-                    print(f"Response Body: {r.text}")
-                if attempt < retryMax:
-                    time.sleep(backoffSeconds * (2 ** attempt))
-
-        if lastError:
-            raise lastError
-        raise RuntimeError("LLM request failed")
+        content = _request_completion(self.settings, self._session, self.provider_name, url, headers, payload)
+        if cache is not None:
+            cache.set(cache_key, content)
+        return content
 
 def _get_task_model(settings: Settings, task_type: str) -> str | None:
     if task_type == "report":
@@ -223,6 +385,8 @@ def _create_openai_provider(settings: Settings, provider: str, model: str) -> LL
     raise ValueError(f"Unknown LLM provider: {provider}")
 
 
+# Settings 为 frozen dataclass，可直接作为缓存键；同一任务共享 provider 及其连接池
+@functools.lru_cache(maxsize=16)
 def get_llm_for_model_spec(settings: Settings, model_spec: str, default_provider: str | None = None) -> LLM:
     provider = default_provider or settings.llm_provider
     provider_name, model = parse_model_spec(model_spec, provider)
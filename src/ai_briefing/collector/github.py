@@ -1,7 +1,10 @@
+import concurrent.futures
 import datetime as dt
-import json
 import logging
+from psycopg.types.json import Jsonb
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from ..config import Settings
 from ..db import get_conn
 
@@ -13,12 +16,7 @@ SEARCH_QUERIES = [
     'topic:agents stars:>100',
 ]
 
-GQL = """
-query($q:String!, $n:Int!, $cursor:String) {
-  search(query:$q, type:REPOSITORY, first:$n, after:$cursor) {
-    pageInfo { hasNextPage endCursor }
-    nodes {
-      ... on Repository {
+REPO_FIELDS = """
         nameWithOwner
         url
         description
@@ -30,7 +28,14 @@ query($q:String!, $n:Int!, $cursor:String) {
         createdAt
         pushedAt
         defaultBranchRef { name }
-      }
+"""
+
+GQL = """
+query($q:String!, $n:Int!, $cursor:String) {
+  search(query:$q, type:REPOSITORY, first:$n, after:$cursor) {
+    pageInfo { hasNextPage endCursor }
+    nodes {
+      ... on Repository {""" + REPO_FIELDS + """      }
     }
   }
 }
@@ -38,14 +43,28 @@ query($q:String!, $n:Int!, $cursor:String) {
 
 logger = logging.getLogger("github_collector")
 
-def fetch_repos(settings: Settings, query: str, batch: int = 50, max_results: int = 100):
+def _build_session() -> requests.Session:
+    # 翻页请求都打同一主机，复用 keep-alive 连接；GraphQL 查询幂等，POST 也允许重试
+    retry = Retry(
+        total=2,
+        backoff_factor=0.3,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=frozenset({"GET", "POST"}),
+        raise_on_status=False,
+    )
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(max_retries=retry))
+    return session
+
+def fetch_repos(settings: Settings, query: str, batch: int = 50, max_results: int = 100, session: requests.Session | None = None):
     headers = {"Authorization": f"Bearer {settings.github_token}"}
+    http = session or requests
     cursor = None
     count = 0
     while True:
         if count >= max_results:
             break
-        r = requests.post(
+        r = http.post(
             GQL_ENDPOINT,
             json={"query": GQL, "variables": {"q": query, "n": batch, "cursor": cursor}},
             headers=headers,
@@ -62,50 +81,110 @@ def fetch_repos(settings: Settings, query: str, batch: int = 50, max_results: in
             break
         cursor = data["pageInfo"]["endCursor"]
 
-def upsert_repo_and_snapshot(conn, repo: dict, captured_at: dt.datetime):
-    topics = [n["topic"]["name"] for n in repo["repositoryTopics"]["nodes"]]
-    full = repo["nameWithOwner"]
-
-    raw_payload = {
-        "full_name": full,
-        "url": repo.get("url"),
-        "description": repo.get("description"),
-        "topics": topics,
-        "language": repo["primaryLanguage"]["name"] if repo.get("primaryLanguage") else None,
-        "stars": repo.get("stargazerCount"),
-        "forks": repo.get("forkCount"),
-        "open_issues": repo.get("issues", {}).get("totalCount"),
-        "created_at": repo.get("createdAt"),
-        "pushed_at": repo.get("pushedAt"),
-        "default_branch": repo["defaultBranchRef"]["name"] if repo.get("defaultBranchRef") else None,
-    }
-
-    with conn.cursor() as cur:
-        try:
-            cur.execute("""
-                INSERT INTO raw_items (
-                    source_kind, source_ref, source_url, retrieved_at, http_status, retrieved_headers,
-                    render_mode, provider_chain, content_snapshot, raw_payload
-                )
-                VALUES (%s, %s, %s, NOW(), %s, %s, %s, %s, %s, %s)
-            """, (
-                "github",
-                full,
-                repo.get("url"),
-                200,
-                json.dumps({}, ensure_ascii=False),
-                "api",
-                ["github_graphql"],
-                f"{full}\n{repo.get('description') or ''}".strip(),
-                json.dumps(raw_payload, ensure_ascii=False),
-            ))
-        except Exception as e:
-            logger.warning(f"raw_items 写入失败: {e}")
-
-        cur.execute("""
-        INSERT INTO repos(full_name, url, description, topics, language, created_at, last_pushed_at,
-                          default_branch, stars, forks, open_issues)
-        VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
+def _build_batch_query(count: int) -> str:
+    # 用别名 s0..sN 把多个 search 合进一个文档，每页只发一次 POST
+    params = ", ".join(f"$q{i}:String!, $c{i}:String" for i in range(count))
+    searches = "".join(
+        f"""
+  s{i}: search(query:$q{i}, type:REPOSITORY, first:$n, after:$c{i}) {{
+    pageInfo {{ hasNextPage endCursor }}
+    nodes {{
+      ... on Repository {{{REPO_FIELDS}      }}
+    }}
+  }}"""
+        for i in range(count)
+    )
+    return f"query($n:Int!, {params}) {{{searches}\n}}\n"
+
+def fetch_repos_batch(settings: Settings, queries: list[str], batch: int = 50, max_results: int = 100,
+                      session: requests.Session | None = None) -> list[list[dict]]:
+    """多个查询同步翻页，返回与 queries 对齐的结果列表；任一查询报错即抛出。"""
+    headers = {"Authorization": f"Bearer {settings.github_token}"}
+    http = session or requests
+    results: list[list[dict]] = [[] for _ in queries]
+    cursors: list[str | None] = [None] * len(queries)
+    active = list(range(len(queries)))
+    while active:
+        variables: dict[str, object] = {"n": batch}
+        for slot, idx in enumerate(active):
+            variables[f"q{slot}"] = queries[idx]
+            variables[f"c{slot}"] = cursors[idx]
+        r = http.post(
+            GQL_ENDPOINT,
+            json={"query": _build_batch_query(len(active)), "variables": variables},
+            headers=headers,
+            timeout=30,
+        )
+        r.raise_for_status()
+        body = r.json()
+        if body.get("errors") or not body.get("data"):
+            raise RuntimeError(f"GraphQL 批量查询返回错误: {body.get('errors')}")
+        # 只保留仍有下一页且未达上限的查询进入下一轮
+        next_active = []
+        for slot, idx in enumerate(active):
+            data = body["data"][f"s{slot}"]
+            remaining = max_results - len(results[idx])
+            results[idx].extend(data["nodes"][:remaining])
+            if len(results[idx]) < max_results and data["pageInfo"]["hasNextPage"]:
+                cursors[idx] = data["pageInfo"]["endCursor"]
+                next_active.append(idx)
+        active = next_active
+    return results
+
+def _build_raw_payload(repo: dict, topics: list[str]) -> dict:
+    return {
+        "full_name": repo["nameWithOwner"],
+        "url": repo.get("url"),
+        "description": repo.get("description"),
+        "topics": topics,
+        "language": repo["primaryLanguage"]["name"] if repo.get("primaryLanguage") else None,
+        "stars": repo.get("stargazerCount"),
+        "forks": repo.get("forkCount"),
+        "open_issues": repo.get("issues", {}).get("totalCount"),
+        "created_at": repo.get("createdAt"),
+        "pushed_at": repo.get("pushedAt"),
+        "default_branch": repo["defaultBranchRef"]["name"] if repo.get("defaultBranchRef") else None,
+    }
+
+def bulk_upsert_repos(conn, repos: list[dict], captured_at: dt.datetime):
+    """raw_items / repos / repo_snapshots 各用一条 UNNEST 语句批量写入。"""
+    # 多个查询可能命中同一 repo；同一语句内 ON CONFLICT 不能重复更新同一行，按 full_name 去重（后者覆盖）
+    unique = list({repo["nameWithOwner"]: repo for repo in repos}.values())
+    if not unique:
+        return
+
+    full_names, urls, descriptions, topics_list, languages = [], [], [], [], []
+    created_ats, pushed_ats, default_branches = [], [], []
+    stars, forks, open_issues = [], [], []
+    snapshots, raw_payloads = [], []
+    for repo in unique:
+        topics = [n["topic"]["name"] for n in repo["repositoryTopics"]["nodes"]]
+        full_names.append(repo["nameWithOwner"])
+        urls.append(repo["url"])
+        descriptions.append(repo.get("description"))
+        # text[][] 会被 UNNEST 展平，topics 以 jsonb 传入后再转回数组
+        topics_list.append(Jsonb(topics))
+        languages.append(repo["primaryLanguage"]["name"] if repo["primaryLanguage"] else None)
+        created_ats.append(repo["createdAt"])
+        pushed_ats.append(repo["pushedAt"])
+        default_branches.append(repo["defaultBranchRef"]["name"] if repo["defaultBranchRef"] else None)
+        stars.append(repo["stargazerCount"])
+        forks.append(repo["forkCount"])
+        open_issues.append(repo["issues"]["totalCount"])
+        snapshots.append(f"{repo['nameWithOwner']}\n{repo.get('description') or ''}".strip())
+        raw_payloads.append(Jsonb(_build_raw_payload(repo, topics)))
+
+    with conn.cursor() as cur:
+        cur.execute("""
+        INSERT INTO repos(full_name, url, description, topics, language, created_at, last_pushed_at,
+                          default_branch, stars, forks, open_issues)
+        SELECT t.full_name, t.url, t.description,
+               ARRAY(SELECT jsonb_array_elements_text(t.topics)),
+               t.language, t.created_at, t.last_pushed_at, t.default_branch, t.stars, t.forks, t.open_issues
+        FROM UNNEST(%s::text[], %s::text[], %s::text[], %s::jsonb[], %s::text[], %s::timestamptz[],
+                    %s::timestamptz[], %s::text[], %s::int[], %s::int[], %s::int[])
+          AS t(full_name, url, description, topics, language, created_at, last_pushed_at,
+               default_branch, stars, forks, open_issues)
         ON CONFLICT (full_name) DO UPDATE SET
           url=EXCLUDED.url,
           description=EXCLUDED.description,
@@ -116,27 +195,51 @@ def upsert_repo_and_snapshot(conn, repo: dict, captured_at: dt.datetime):
           stars=EXCLUDED.stars,
           forks=EXCLUDED.forks,
           open_issues=EXCLUDED.open_issues
-        RETURNING id
+        RETURNING id, full_name
         """, (
-            full, repo["url"], repo.get("description"), topics,
-            (repo["primaryLanguage"]["name"] if repo["primaryLanguage"] else None),
-            repo["createdAt"], repo["pushedAt"],
-            (repo["defaultBranchRef"]["name"] if repo["defaultBranchRef"] else None),
-            repo["stargazerCount"], repo["forkCount"], repo["issues"]["totalCount"],
+            full_names, urls, descriptions, topics_list, languages, created_ats,
+            pushed_ats, default_branches, stars, forks, open_issues,
         ))
-        repo_id = cur.fetchone()[0]
+        repo_ids = {full_name: repo_id for repo_id, full_name in cur.fetchall()}
 
+        snapshot_ids = [repo_ids[name] for name in full_names]
         cur.execute("""
         INSERT INTO repo_snapshots(repo_id, captured_at, stars, forks, open_issues)
-        VALUES (%s,%s,%s,%s,%s)
-        """, (repo_id, captured_at, repo["stargazerCount"], repo["forkCount"], repo["issues"]["totalCount"]))
+        SELECT t.repo_id, %s, t.stars, t.forks, t.open_issues
+        FROM UNNEST(%s::bigint[], %s::int[], %s::int[], %s::int[]) AS t(repo_id, stars, forks, open_issues)
+        """, (captured_at, snapshot_ids, stars, forks, open_issues))
+
+        # raw_items 仅作留档：放在已开启的事务中用保存点包住，失败只回滚本条，不影响 repos/repo_snapshots
+        try:
+            with conn.transaction():
+                cur.execute("""
+                    INSERT INTO raw_items (
+                        source_kind, source_ref, source_url, retrieved_at, http_status, retrieved_headers,
+                        render_mode, provider_chain, content_snapshot, raw_payload
+                    )
+                    SELECT 'github', t.source_ref, t.source_url, NOW(), 200, '{}'::jsonb,
+                           'api', ARRAY['github_graphql'], t.content_snapshot, t.raw_payload
+                    FROM UNNEST(%s::text[], %s::text[], %s::text[], %s::jsonb[])
+                      AS t(source_ref, source_url, content_snapshot, raw_payload)
+                """, (full_names, urls, snapshots, raw_payloads))
+        except Exception as e:
+            logger.warning(f"raw_items 写入失败: {e}")
 
 def run(settings: Settings):
     if not settings.github_token:
         raise RuntimeError("GITHUB_TOKEN is required for GitHub collector.")
     captured_at = dt.datetime.now(dt.timezone.utc)
+    with _build_session() as session:
+        def _fetch_all(query: str) -> list[dict]:
+            return list(fetch_repos(settings, query, session=session))
+
+        try:
+            results = fetch_repos_batch(settings, SEARCH_QUERIES, session=session)
+        except Exception as e:
+            logger.warning(f"GraphQL 批量查询失败，回退为逐个查询: {e}")
+            # 各查询的游标互相独立，并发翻页；拿到全部结果后再统一批量写库
+            with concurrent.futures.ThreadPoolExecutor(max_workers=len(SEARCH_QUERIES)) as executor:
+                results = list(executor.map(_fetch_all, SEARCH_QUERIES))
     with get_conn(settings) as conn:
-        for q in SEARCH_QUERIES:
-            for repo in fetch_repos(settings, q):
-                upsert_repo_and_snapshot(conn, repo, captured_at)
+        bulk_upsert_repos(conn, [repo for repos in results for repo in repos], captured_at)
         conn.commit()
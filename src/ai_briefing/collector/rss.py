@@ -1,22 +1,39 @@
 import concurrent.futures
 import datetime as dt
+from email.utils import parsedate_to_datetime
+import functools
 import hashlib
-import json
+import io
 import logging
 import os
 import re
-from typing import List, Dict, Optional, Mapping
+from typing import List, Dict, Optional, Mapping, Tuple
 from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
 
 import feedparser
+from psycopg.types.json import Jsonb
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import yaml
 
 from ..config import Settings
 from ..db import get_conn
+
+try:
+    from lxml import etree
+except ImportError:  # lxml 为可选依赖，缺失时全部走 feedparser
+    etree = None
 
 logger = logging.getLogger("rss_collector")
 
+# 优先使用 libyaml 的 C 实现，未编译时退回纯 Python 版本
+_YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+_WHITESPACE_RE = re.compile(r"\s+")
+# 无查询串的纯 ASCII URL：scheme://netloc/path[#fragment]，可直接切分
+_SIMPLE_URL_RE = re.compile(r"([A-Za-z][A-Za-z0-9+.\-]*)://([^/?#\[\]]+)(/[^?#]*)?(?:#.*)?")
+
 DROP_QUERY_PARAMS = {
     "utm_source",
     "utm_medium",
@@ -34,41 +51,77 @@ DROP_QUERY_PARAMS = {
     "mc_eid",
 }
 
+def _build_session(pool_size: int) -> requests.Session:
+    # 整轮抓取共用连接池；429/5xx 在适配器层做少量重试，最终响应仍交给调用方判断
+    retry = Retry(total=2, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504], raise_on_status=False)
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
 def load_sources(path: str) -> List[Dict]:
     with open(path, 'r', encoding='utf-8') as f:
-        data = yaml.safe_load(f)
+        data = yaml.load(f, Loader=_YamlLoader)
     if not data:
         return []
     if not isinstance(data, list):
         raise ValueError("rss_sources.yaml must be a list of sources")
     return data
 
+def _match_simple_url(url: str) -> Optional[re.Match]:
+    # 含空白/控制字符、非 ASCII 或带查询串的 URL 交给 urlsplit 处理
+    if not url.isascii() or not url.isprintable() or " " in url:
+        return None
+    return _SIMPLE_URL_RE.fullmatch(url)
+
+# 同一发布方的 URL/域名在各条目间大量重复，纯函数直接做 LRU 缓存
+@functools.lru_cache(maxsize=8192)
 def canonicalize_url(url: str) -> str:
     if not url:
         return ""
+    url = url.strip()
+    match = _match_simple_url(url)
+    if match:
+        return f"{match.group(1).lower()}://{match.group(2)}{match.group(3) or ''}"
     try:
-        parts = urlsplit(url.strip())
+        parts = urlsplit(url)
     except Exception:
         return ""
     if not parts.scheme or not parts.netloc:
         return ""
-    filtered = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k.lower() not in DROP_QUERY_PARAMS]
-    query = urlencode(filtered, doseq=True)
+    query = ""
+    if parts.query:
+        filtered = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k.lower() not in DROP_QUERY_PARAMS]
+        query = urlencode(filtered, doseq=True)
     return urlunsplit((parts.scheme, parts.netloc, parts.path, query, ""))
 
+@functools.lru_cache(maxsize=8192)
 def extract_domain(url: str) -> str:
     if not url:
         return ""
+    match = _match_simple_url(url)
+    if match:
+        return match.group(2).lower()
     try:
         parts = urlsplit(url)
     except Exception:
         return ""
     return parts.netloc.lower() if parts.netloc else ""
 
+@functools.lru_cache(maxsize=8192)
 def normalize_title(title: str) -> str:
     if not title:
         return ""
-    return re.sub(r"\s+", " ", title.strip().lower())
+    # 先合并空白再 strip，结果与原 strip→lower→sub 一致，保持 hash_key 不变
+    return _WHITESPACE_RE.sub(" ", title.lower()).strip()
+
+def build_hash_key(canonical_url: str, title: str, domain: str) -> Optional[str]:
+    hash_source = canonical_url or f"{normalize_title(title)}|{domain}"
+    if not hash_source.strip():
+        return None
+    # hash_key 只是去重键而非安全边界；blake2b 在短输入上比 md5 快，16 字节摘要与原长度一致
+    return hashlib.blake2b(hash_source.encode('utf-8'), digest_size=16).hexdigest()
 
 def build_content_snapshot(title: str, summary: str, max_len: int = 800) -> str:
     combined = f"{title}\n{summary}".strip()
@@ -92,35 +145,173 @@ def parse_published_at(value: object) -> dt.datetime:
             return dt.datetime.now(dt.timezone.utc)
     return dt.datetime.now(dt.timezone.utc)
 
-def fetch_feed(url: str, tags: List[str]) -> List[Dict]:
+def load_feed_cache(settings: Settings, feed_urls: List[str]) -> Dict[str, Dict]:
+    if not feed_urls:
+        return {}
+    try:
+        with get_conn(settings) as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    "SELECT feed_url, etag, last_modified FROM feed_cache WHERE feed_url = ANY(%s)",
+                    (feed_urls,),
+                )
+                rows = cur.fetchall()
+    except Exception as e:
+        logger.warning(f"读取 feed_cache 失败，本轮不做条件请求: {e}")
+        return {}
+    return {r[0]: {"etag": r[1], "last_modified": r[2]} for r in rows}
+
+FEED_MAX_ENTRIES = 100
+# encoded 即 RSS 的 content:encoded；feedparser 在无 description 时以它作为 summary
+FEED_TEXT_FIELDS = frozenset({"title", "description", "summary", "content", "encoded", "pubDate", "published", "updated", "date"})
+FEED_SUMMARY_FIELDS = ("description", "summary", "content", "encoded")
+
+def _local_name(tag: object) -> str:
+    if not isinstance(tag, str):
+        return ""
+    return tag.rsplit("}", 1)[-1]
+
+def _parse_entry_date(value: str) -> Optional[dt.datetime]:
+    """无日期时取当前时间；有日期但无法解析时返回 None，由调用方退回 feedparser。"""
+    value = value.strip()
+    if not value:
+        return dt.datetime.now(dt.timezone.utc)
+    try:
+        # Atom 为 ISO 8601（数字开头），RSS pubDate 为 RFC 822
+        parsed = dt.datetime.fromisoformat(value) if value[:4].isdigit() else parsedate_to_datetime(value)
+    except Exception:
+        return None
+    # 与 feedparser 的 struct_time 一致，只精确到秒
+    parsed = parsed.replace(microsecond=0)
+    if parsed.tzinfo is None:
+        return parsed.replace(tzinfo=dt.timezone.utc)
+    return parsed.astimezone(dt.timezone.utc)
+
+def parse_feed_fast(content: bytes) -> Optional[List[Dict]]:
+    """用 lxml 只抽取 title/link/summary/日期；无 lxml、XML 不合法或未识别出条目时返回 None。
+
+    条目含 HTML/XHTML 标记或无法解析的日期时同样返回 None：feedparser 会清洗标记、
+    识别更多日期格式，整份交给它处理，保证入库文本与解析器无关。
+    """
+    if etree is None or not content:
+        return None
+    entries: List[Dict] = []
+    try:
+        context = etree.iterparse(
+            io.BytesIO(content),
+            events=("end",),
+            tag=("{*}item", "{*}entry"),
+            resolve_entities=False,
+            no_network=True,
+        )
+        for _, el in context:
+            fields: Dict[str, str] = {}
+            link = ""
+            for child in el:
+                name = _local_name(child.tag)
+                if name == "link":
+                    # Atom 用 href 属性且只取 alternate；RSS 直接取文本
+                    href = child.get("href")
+                    if href is None:
+                        link = link or (child.text or "").strip()
+                    elif child.get("rel", "alternate") == "alternate" and not link:
+                        link = href.strip()
+                elif name in FEED_TEXT_FIELDS:
+                    if name in fields or len(child):
+                        # 字段重复（取舍规则不同）或内嵌 XHTML 等子元素
+                        return None
+                    fields[name] = child.text or ""
+            title = fields.get("title")
+            # 与 feedparser 一致按元素是否出现取值，空的 description 也不会退到正文
+            summary = next((fields[key] for key in FEED_SUMMARY_FIELDS if key in fields), "")
+            if "<" in summary or (title and "<" in title):
+                # 可能是转义/CDATA 中的 HTML，需要 feedparser 的清洗
+                return None
+            published_at = _parse_entry_date(
+                fields.get("pubDate") or fields.get("published") or fields.get("updated") or fields.get("date") or ""
+            )
+            if published_at is None:
+                return None
+            entries.append({
+                # 缺少 title 时与 feedparser 分支一致
+                "title": title.strip() if title is not None else "No Title",
+                "link": link,
+                "summary": summary,
+                "published_at": published_at,
+            })
+            # 处理完即释放已解析节点，保持内存平稳
+            el.clear()
+            while el.getprevious() is not None:
+                del el.getparent()[0]
+            if len(entries) >= FEED_MAX_ENTRIES:
+                break
+    except etree.XMLSyntaxError:
+        return None
+    return entries or None
+
+def _parse_feed_entries(content: bytes) -> Tuple[List[Dict], str]:
+    entries = parse_feed_fast(content)
+    if entries is not None:
+        return entries, "lxml"
+    # 非标准或损坏的 feed 交给容错更强的 feedparser
+    f = feedparser.parse(content)
+    entries = []
+    for entry in f.entries[:FEED_MAX_ENTRIES]:
+        published_parsed = entry.get('published_parsed') or entry.get('updated_parsed')
+        entries.append({
+            "title": entry.get('title', 'No Title'),
+            "link": entry.get('link', ''),
+            "summary": entry.get('summary', '') or entry.get('description', ''),
+            "published_at": parse_published_at(published_parsed),
+        })
+    return entries, "feedparser"
+
+def fetch_feed(url: str, tags: List[str], session: Optional[requests.Session] = None,
+               validators: Optional[Dict] = None) -> List[Dict]:
     logger.info(f"Starting fetch for {url}...")
     try:
+        headers = {'User-Agent': 'Mozilla/5.0'}
+        # 带上上次的 ETag / Last-Modified，未变化时服务端返回 304
+        if validators:
+            if validators.get("etag"):
+                headers['If-None-Match'] = validators["etag"]
+            if validators.get("last_modified"):
+                headers['If-Modified-Since'] = validators["last_modified"]
         # 使用超时避免阻塞
         # 10 秒连接，45 秒读取
-        resp = requests.get(url, timeout=(10.0, 45.0), headers={'User-Agent': 'Mozilla/5.0'})
-        if resp.status_code != 200:
-            logger.error(f"Failed to fetch {url}, status: {resp.status_code}")
-            return []
-            
-        f = feedparser.parse(resp.content)
-        header_info = extract_headers(resp.headers)
+        http = session or requests
+        with http.get(url, timeout=(10.0, 45.0), headers=headers, stream=True) as resp:
+            if resp.status_code == 304:
+                logger.info(f"Feed not modified: {url}")
+                return []
+            if resp.status_code != 200:
+                logger.error(f"Failed to fetch {url}, status: {resp.status_code}")
+                return []
+
+            # 从（已解压的）响应流读取一次，lxml 解析失败时同一份字节交给 feedparser
+            resp.raw.decode_content = True
+            content = resp.raw.read()
+            header_info = extract_headers(resp.headers)
         
+        entries, parser_name = _parse_feed_entries(content)
         items = []
-        # 最多处理前 100 条
-        for entry in f.entries[:100]:
-            # 处理日期
-            published_parsed = entry.get('published_parsed') or entry.get('updated_parsed')
-            pub_date = parse_published_at(published_parsed)
+        for entry in entries:
+            pub_date = entry['published_at']
             
-            # 内容摘要
-            summary = str(entry.get('summary', '') or entry.get('description', '') or '')
-            title = str(entry.get('title', 'No Title') or 'No Title')
-            url_link = str(entry.get('link', '') or '')
+            # 去空白、URL 规范化与 hash_key 在抓取线程里一次算好，入库循环只做组装
+            summary = str(entry['summary'] or '').strip()
+            title = str(entry['title'] or 'No Title').strip()
+            url_link = str(entry['link'] or '').strip()
+            canonical_url = canonicalize_url(url_link)
+            domain = extract_domain(canonical_url or url_link)
             content_snapshot = build_content_snapshot(title, summary)
             
             items.append({
                 'title': title,
                 'url': url_link,
+                'canonical_url': canonical_url,
+                'domain': domain,
+                'hash_key': build_hash_key(canonical_url, title, domain),
                 'summary': summary,
                 'published_at': pub_date,
                 'source_tags': tags,
@@ -128,7 +319,7 @@ def fetch_feed(url: str, tags: List[str]) -> List[Dict]:
                 'http_status': resp.status_code,
                 'retrieved_headers': header_info,
                 'render_mode': 'rss',
-                'provider_chain': ['feedparser'],
+                'provider_chain': [parser_name],
                 'content_snapshot': content_snapshot,
             })
         return items
@@ -156,17 +347,19 @@ def run(settings: Settings):
         return
 
     items_to_save = []
+    feed_cache = load_feed_cache(settings, [src['url'] for src in sources if src.get('url')])
+    feed_cache_rows = []
     
     # 并发抓取（限制线程数保证稳定）
     worker_count = max(1, min(settings.rss_max_workers, len(sources)))
-    with concurrent.futures.ThreadPoolExecutor(max_workers=worker_count) as executor:
+    with _build_session(worker_count) as session, concurrent.futures.ThreadPoolExecutor(max_workers=worker_count) as executor:
         future_to_source = {}
         for src in sources:
             url = src.get('url')
             if not url:
                 logger.warning(f"Skipping source with missing url: {src}")
                 continue
-            future_to_source[executor.submit(fetch_feed, url, src.get('tags', []))] = src
+            future_to_source[executor.submit(fetch_feed, url, src.get('tags', []), session, feed_cache.get(url))] = src
         
         for future in concurrent.futures.as_completed(future_to_source):
             src = future_to_source[future]
@@ -176,100 +369,123 @@ def run(settings: Settings):
                 for item in fetched:
                     item['source_name'] = src.get('name', 'Unknown Source')
                 items_to_save.extend(fetched)
+                if fetched:
+                    header_info = fetched[0].get('retrieved_headers') or {}
+                    if header_info.get('etag') or header_info.get('last_modified'):
+                        feed_cache_rows.append((src['url'], header_info.get('etag'), header_info.get('last_modified')))
                 logger.info(f"Fetched {len(fetched)} items from {src.get('name', 'Unknown Source')}")
             except Exception as e:
                 logger.error(f"Error fetching {src.get('name', 'Unknown Source')}: {e}")
 
-    new_count = 0
-    dup_count = 0
+    # 先在内存中组装好每条的参数，再用一次 executemany 批量写入（psycopg 自动走 pipeline）
+    rows = []
+    row_keys = []
     skip_count = 0
-    conn = get_conn(settings)
-    try:
-        with conn.cursor() as cur:
-            for item in items_to_save:
-                url = (item.get('url') or "").strip()
-                canonical_url = canonicalize_url(url)
-                domain = extract_domain(canonical_url or url)
-                title = item.get('title', '').strip()
-                summary = item.get('summary', '').strip()
-                published_at = item.get('published_at')
+    for item in items_to_save:
+        hash_key = item.get('hash_key')
+        if not hash_key:
+            skip_count += 1
+            logger.warning("Skipping item with empty hash source")
+            continue
+        url = item.get('url') or ""
+        canonical_url = item.get('canonical_url') or ""
+        domain = item.get('domain') or ""
+        title = item.get('title') or ""
+        summary = item.get('summary') or ""
+        published_at = item.get('published_at')
 
-                hash_source = canonical_url or f"{normalize_title(title)}|{domain}"
-                if not hash_source.strip():
-                    skip_count += 1
-                    logger.warning("Skipping item with empty hash source")
-                    continue
-                hash_key = hashlib.md5(hash_source.encode('utf-8')).hexdigest()
+        raw = {
+            "source_tags": item.get("source_tags", []),
+            "source_name": item.get("source_name", ""),
+        }
 
-                raw = {
-                    "source_tags": item.get("source_tags", []),
-                    "source_name": item.get("source_name", ""),
-                }
+        raw_payload = {
+            "title": title,
+            "url": url or canonical_url,
+            "summary": summary,
+            "published_at": published_at.isoformat() if published_at else None,
+            "source_tags": item.get("source_tags", []),
+            "source_name": item.get("source_name", ""),
+            "feed_url": item.get("source_feed_url", ""),
+        }
 
-                raw_payload = {
-                    "title": title,
-                    "url": url or canonical_url,
-                    "summary": summary,
-                    "published_at": published_at.isoformat() if published_at else None,
-                    "source_tags": item.get("source_tags", []),
-                    "source_name": item.get("source_name", ""),
-                    "feed_url": item.get("source_feed_url", ""),
-                }
+        rows.append((
+            "rss",
+            item.get("source_feed_url"),
+            url or canonical_url,
+            item.get("http_status"),
+            Jsonb(item.get("retrieved_headers") or {}),
+            item.get("render_mode") or "rss",
+            item.get("provider_chain") or ["feedparser"],
+            item.get("content_snapshot") or build_content_snapshot(title, summary),
+            Jsonb(raw_payload),
+            hash_key,
+            url or canonical_url,
+            canonical_url or None,
+            title or "No Title",
+            summary,
+            item.get('source_name', 'Unknown Source'),
+            published_at,
+            domain or None,
+            Jsonb(raw),
+        ))
+        row_keys.append((hash_key, canonical_url or None))
 
-                raw_item_id: Optional[int] = None
-                try:
-                    cur.execute("""
-                        INSERT INTO raw_items (
-                            source_kind, source_ref, source_url, retrieved_at, http_status, retrieved_headers,
-                            render_mode, provider_chain, content_snapshot, raw_payload
+    new_count = 0
+    dup_count = 0
+    if rows or feed_cache_rows:
+        with get_conn(settings) as conn:
+            try:
+                with conn.cursor() as cur:
+                    if rows:
+                        # 定时轮询时绝大多数条目已入库：先一次查出已存在的键，只插入真正的新条目
+                        cur.execute(
+                            "SELECT hash_key, canonical_url FROM items WHERE hash_key = ANY(%s) OR canonical_url = ANY(%s)",
+                            ([k[0] for k in row_keys], [k[1] for k in row_keys if k[1]]),
                         )
-                        VALUES (%s, %s, %s, NOW(), %s, %s, %s, %s, %s, %s)
-                        RETURNING id
-                    """, (
-                        "rss",
-                        item.get("source_feed_url"),
-                        url or canonical_url,
-                        item.get("http_status"),
-                        json.dumps(item.get("retrieved_headers") or {}, ensure_ascii=False),
-                        item.get("render_mode") or "rss",
-                        item.get("provider_chain") or ["feedparser"],
-                        item.get("content_snapshot") or build_content_snapshot(title, summary),
-                        json.dumps(raw_payload, ensure_ascii=False),
-                    ))
-                    row = cur.fetchone()
-                    if row:
-                        raw_item_id = row[0]
-                except Exception as ex:
-                    logger.error(f"Error inserting raw_item {url}: {ex}")
+                        existing = {key for pair in cur.fetchall() for key in pair if key}
+                        rows = [
+                            row for row, (hash_key, canonical_url) in zip(rows, row_keys)
+                            if hash_key not in existing and canonical_url not in existing
+                        ]
+                        dup_count = len(row_keys) - len(rows)
+
+                    if rows:
+                        # raw_items 与 items 合成一条 CTE 语句，raw_item_id 在服务端直接关联，无需回读
+                        cur.executemany("""
+                            WITH raw AS (
+                                INSERT INTO raw_items (
+                                    source_kind, source_ref, source_url, retrieved_at, http_status, retrieved_headers,
+                                    render_mode, provider_chain, content_snapshot, raw_payload
+                                )
+                                VALUES (%s, %s, %s, NOW(), %s, %s, %s, %s, %s, %s)
+                                RETURNING id
+                            )
+                            INSERT INTO items (hash_key, url, canonical_url, title, summary, source, published_at, fetched_at, domain, raw, raw_item_id)
+                            SELECT %s, %s, %s, %s, %s, %s, %s::timestamptz, NOW(), %s, %s, raw.id FROM raw
+                            ON CONFLICT DO NOTHING
+                        """, rows)
+                        # executemany 的 rowcount 为所有语句影响行数之和；批内重复仍由 ON CONFLICT 兜底
+                        new_count = max(cur.rowcount, 0)
+                        dup_count += len(rows) - new_count
+
+                    # 与条目同事务记录校验值，条目写入失败时不会误把源标记为已处理
+                    if feed_cache_rows:
+                        try:
+                            with conn.transaction():
+                                cur.executemany("""
+                                    INSERT INTO feed_cache (feed_url, etag, last_modified, last_fetched_at)
+                                    VALUES (%s, %s, %s, NOW())
+                                    ON CONFLICT (feed_url) DO UPDATE SET
+                                      etag = EXCLUDED.etag,
+                                      last_modified = EXCLUDED.last_modified,
+                                      last_fetched_at = EXCLUDED.last_fetched_at
+                                """, feed_cache_rows)
+                        except Exception as e:
+                            logger.warning(f"写入 feed_cache 失败: {e}")
+                conn.commit()
+            except Exception as e:
+                logger.error(f"Database error in RSS run: {e}")
+                conn.rollback()
 
-                try:
-                    cur.execute("""
-                        INSERT INTO items (hash_key, url, canonical_url, title, summary, source, published_at, fetched_at, domain, raw, raw_item_id)
-                        VALUES (%s, %s, %s, %s, %s, %s, %s, NOW(), %s, %s, %s)
-                        ON CONFLICT DO NOTHING
-                    """, (
-                        hash_key,
-                        url or canonical_url,
-                        canonical_url or None,
-                        title or "No Title",
-                        summary,
-                        item.get('source_name', 'Unknown Source'),
-                        published_at,
-                        domain or None,
-                        json.dumps(raw, ensure_ascii=False),
-                        raw_item_id,
-                    ))
-                    if cur.rowcount:
-                        new_count += 1
-                    else:
-                        dup_count += 1
-                except Exception as ex:
-                    logger.error(f"Error inserting item {url}: {ex}")
-        conn.commit()
-    except Exception as e:
-        logger.error(f"Database error in RSS run: {e}")
-        conn.rollback()
-    finally:
-        conn.close()
-
     logger.info(f"Collected {new_count} new items (Multi-threaded). Duplicates: {dup_count}, Skipped: {skip_count}.")
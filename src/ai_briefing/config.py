@@ -1,9 +1,13 @@
+import functools
 import os
 from dataclasses import dataclass
+
+_TRUTHY_VALUES = frozenset({"true", "1", "yes"})
 
 @dataclass(frozen=True)
 class Settings:
     database_url: str
+    db_pool_max_size: int
     github_token: str | None
     feishu_app_id: str | None
     feishu_app_secret: str | None
@@ -13,6 +17,7 @@ class Settings:
     feishu_event_verification_token: str | None
     feishu_max_chars: int
     feishu_group_by_kind: bool
+    feishu_push_max_workers: int
     llm_provider: str
     llm_model: str | None
     glm_api_key: str | None
@@ -31,7 +36,10 @@ class Settings:
     llm_max_workers: int
     llm_retry_max: int
     llm_retry_backoff_seconds: int
+    llm_rate_limit_rpm: int
     llm_cache_enabled: bool
+    llm_cache_max_size: int
+    llm_cache_file: str | None
     prompt_templates_file: str
     rss_sources_file: str
     rss_max_workers: int
@@ -60,6 +68,7 @@ class Settings:
     google_ai_api_key: str | None
     image_docx_parent_type: str
     graphviz_font: str | None
+    graphviz_inprocess: bool
 
 def _get_optional_env(name: str) -> str | None:
     value = os.getenv(name)
@@ -68,9 +77,12 @@ def _get_optional_env(name: str) -> str | None:
     value = value.strip()
     return value if value else None
 
+# 环境变量在进程启动（load_dotenv）后不再变化，解析一次即可；需重新读取时调用 get_settings.cache_clear()
+@functools.lru_cache(maxsize=1)
 def get_settings() -> Settings:
     return Settings(
         database_url=os.environ["DATABASE_URL"],
+        db_pool_max_size=int(os.getenv("DB_POOL_MAX_SIZE", 4)),
         github_token=os.getenv("GITHUB_TOKEN"),
         feishu_app_id=os.getenv("FEISHU_APP_ID"),
         feishu_app_secret=os.getenv("FEISHU_APP_SECRET"),
@@ -79,12 +91,13 @@ def get_settings() -> Settings:
         feishu_event_encrypt_key=_get_optional_env("FEISHU_EVENT_ENCRYPT_KEY"),
         feishu_event_verification_token=_get_optional_env("FEISHU_EVENT_VERIFICATION_TOKEN"),
         feishu_max_chars=int(os.getenv("FEISHU_MAX_CHARS", 3000)),
-        feishu_group_by_kind=os.getenv("FEISHU_GROUP_BY_KIND", "true").lower() in ("true", "1", "yes"),
+        feishu_group_by_kind=os.getenv("FEISHU_GROUP_BY_KIND", "true").lower() in _TRUTHY_VALUES,
+        feishu_push_max_workers=int(os.getenv("FEISHU_PUSH_MAX_WORKERS", 1)),
         llm_provider=os.getenv("LLM_PROVIDER", "glm"),
         llm_model=_get_optional_env("LLM_MODEL"),
         glm_api_key=os.getenv("GLM_API_KEY"),
         glm_base_url=os.getenv("GLM_BASE_URL"),
-        glm_enable_thinking=os.getenv("GLM_ENABLE_THINKING", "false").lower() in ("true", "1", "yes"),
+        glm_enable_thinking=os.getenv("GLM_ENABLE_THINKING", "false").lower() in _TRUTHY_VALUES,
         openai_api_key=_get_optional_env("OPENAI_API_KEY"),
         openai_base_url=_get_optional_env("OPENAI_BASE_URL"),
         deepseek_api_key=_get_optional_env("DEEPSEEK_API_KEY"),
@@ -98,7 +111,10 @@ def get_settings() -> Settings:
         llm_max_workers=int(os.getenv("LLM_MAX_WORKERS", 1)),
         llm_retry_max=int(os.getenv("LLM_RETRY_MAX", 1)),
         llm_retry_backoff_seconds=int(os.getenv("LLM_RETRY_BACKOFF_SECONDS", 2)),
-        llm_cache_enabled=os.getenv("LLM_CACHE_ENABLED", "true").lower() in ("true", "1", "yes"),
+        llm_rate_limit_rpm=int(os.getenv("LLM_RATE_LIMIT_RPM", 0)),
+        llm_cache_enabled=os.getenv("LLM_CACHE_ENABLED", "true").lower() in _TRUTHY_VALUES,
+        llm_cache_max_size=int(os.getenv("LLM_CACHE_MAX_SIZE", 1000)),
+        llm_cache_file=_get_optional_env("LLM_CACHE_FILE"),
         prompt_templates_file=os.getenv("PROMPT_TEMPLATES_FILE", "/opt/ai_briefing/configs/prompt_templates.yaml"),
         rss_sources_file=os.getenv("RSS_SOURCES_FILE", "/opt/ai_briefing/configs/rss_sources.yaml"),
         rss_max_workers=int(os.getenv("RSS_MAX_WORKERS", 10)),
@@ -111,15 +127,15 @@ def get_settings() -> Settings:
         daily_top_repos=int(os.getenv("DAILY_TOP_REPOS", 10)),
         hourly_top_repos=int(os.getenv("HOURLY_TOP_REPOS", 5)),
         branch_specs_file=os.getenv("BRANCH_SPECS_FILE", "/opt/ai_briefing/configs/branch_specs.yaml"),
-        x_enabled=os.getenv("X_ENABLED", "true").lower() in ("true", "1", "yes"),
+        x_enabled=os.getenv("X_ENABLED", "true").lower() in _TRUTHY_VALUES,
         llm_task_model_report=_get_optional_env("LLM_TASK_MODEL_REPORT"),
         llm_task_model_factcheck=_get_optional_env("LLM_TASK_MODEL_FACTCHECK"),
         llm_task_model_dedup=_get_optional_env("LLM_TASK_MODEL_DEDUP"),
         llm_task_model_ranking=_get_optional_env("LLM_TASK_MODEL_RANKING"),
         llm_task_model_wechat=_get_optional_env("LLM_TASK_MODEL_WECHAT"),
-        feishu_doc_daily_folder=os.getenv("FEISHU_DOC_DAILY_FOLDER", "false").lower() in ("true", "1", "yes"),
+        feishu_doc_daily_folder=os.getenv("FEISHU_DOC_DAILY_FOLDER", "false").lower() in _TRUTHY_VALUES,
         feishu_doc_date_format=os.getenv("FEISHU_DOC_DATE_FORMAT", "%Y-%m-%d"),
-        image_prompt_enabled=os.getenv("IMAGE_PROMPT_ENABLED", "false").lower() in ("true", "1", "yes"),
+        image_prompt_enabled=os.getenv("IMAGE_PROMPT_ENABLED", "false").lower() in _TRUTHY_VALUES,
         image_output_dir=os.getenv("IMAGE_OUTPUT_DIR", "/opt/ai_briefing/images"),
         image_max_count=int(os.getenv("IMAGE_MAX_COUNT", 3)),
         image_size=os.getenv("IMAGE_SIZE", "1024x1024"),
@@ -127,4 +143,5 @@ def get_settings() -> Settings:
         google_ai_api_key=_get_optional_env("GOOGLE_AI_API_KEY"),
         image_docx_parent_type=os.getenv("IMAGE_DOCX_PARENT_TYPE", "docx_image"),
         graphviz_font=_get_optional_env("GRAPHVIZ_FONT"),
+        graphviz_inprocess=os.getenv("GRAPHVIZ_INPROCESS", "false").lower() in _TRUTHY_VALUES,
     )
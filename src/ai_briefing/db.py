@@ -1,5 +1,63 @@
+import atexit
+import functools
+import threading
+
 import psycopg
+from psycopg.types.json import set_json_dumps
+
+try:
+    from psycopg_pool import ConnectionPool
+except ImportError:
+    ConnectionPool = None
+
+try:
+    import orjson
+except ImportError:  # orjson 为可选依赖，缺失时使用 psycopg 默认的 json.dumps
+    orjson = None
+
 from .config import Settings
 
+# Jsonb 参数直接由 orjson 序列化为 bytes 发送，省去 json.dumps 生成中间字符串
+# 全进程生效：OPT_NON_STR_KEYS 让 int 等非字符串键像 json.dumps 一样转成字符串，而不是抛 TypeError
+if orjson is not None:
+    set_json_dumps(functools.partial(orjson.dumps, option=orjson.OPT_NON_STR_KEYS))
+
+# 同一会话内重复执行的插入语句第二次起即走服务端预编译计划
+PREPARE_THRESHOLD = 1
+
+# 进程级连接池，按 database_url 复用；同一进程内多次调度共享
+pools: dict[str, "ConnectionPool"] = {}
+poolsLock = threading.Lock()
+
+def _get_pool(settings: Settings) -> "ConnectionPool | None":
+    if ConnectionPool is None or settings.db_pool_max_size <= 0:
+        return None
+    url = settings.database_url
+    pool = pools.get(url)
+    if pool is not None:
+        return pool
+    with poolsLock:
+        pool = pools.get(url)
+        if pool is None:
+            pool = ConnectionPool(
+                url,
+                min_size=1,
+                max_size=settings.db_pool_max_size,
+                kwargs={"autocommit": False, "prepare_threshold": PREPARE_THRESHOLD},
+                max_idle=300,
+                num_workers=2,
+                open=True,
+            )
+            atexit.register(pool.close)
+            pools[url] = pool
+    return pool
+
 def get_conn(settings: Settings):
-    return psycopg.connect(settings.database_url)
+    """返回数据库连接上下文，需配合 `with get_conn(settings) as conn:` 使用。
+
+    退出时提交（异常则回滚）；启用连接池时连接归还池中而非关闭。
+    """
+    pool = _get_pool(settings)
+    if pool is None:
+        return psycopg.connect(settings.database_url, prepare_threshold=PREPARE_THRESHOLD)
+    return pool.connection()
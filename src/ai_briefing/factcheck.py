@@ -1,31 +1,40 @@
 from __future__ import annotations
 
+import concurrent.futures
 import datetime as dt
 import json
 import logging
+import re
 from typing import Dict, List, Optional
 
+from psycopg.types.json import Jsonb
+
 from .branch_specs import load_branch_specs
 from .briefing.llm import get_llm
 from .config import Settings
 from .db import get_conn
 
+try:
+    import orjson
+except ImportError:  # orjson 为可选依赖，缺失时退回标准库
+    orjson = None
+
 
 logger = logging.getLogger("factcheck")
 
+_json_loads = orjson.loads if orjson is not None else json.loads
+_FENCE_RE = re.compile(r"^```(?:json)?\s*|\s*```$", re.IGNORECASE)
+
 
 def _extract_json(text: str) -> Dict:
     if not text:
         raise ValueError("Empty LLM response")
-    cleaned = text.strip()
-    if cleaned.startswith("```"):
-        cleaned = cleaned.strip("`")
-        cleaned = cleaned.replace("json", "", 1).strip()
+    cleaned = _FENCE_RE.sub("", text.strip())
     start = cleaned.find("{")
     end = cleaned.rfind("}")
     if start != -1 and end != -1:
         cleaned = cleaned[start:end + 1]
-    return json.loads(cleaned)
+    return _json_loads(cleaned)
 
 
 def _normalize_list(value) -> List[str]:
@@ -80,8 +89,14 @@ def _build_factcheck_prompt(cluster: Dict, evidence_lines: List[str]) -> str:
 """
 
 
-def _collect_evidence_lines(cur, items: List[Dict], max_items: int = 6) -> List[str]:
-    raw_ids = [i.get("raw_item_id") for i in items if i.get("raw_item_id")]
+def _load_raw_map(cur, clusters: List[Dict]) -> Dict[int, Dict]:
+    # 所有聚类的 raw_item 一次性查出，避免逐聚类往返
+    raw_ids = list({
+        i.get("raw_item_id")
+        for cluster in clusters
+        for i in cluster.get("items", [])
+        if i.get("raw_item_id")
+    })
     raw_map: Dict[int, Dict] = {}
     if raw_ids:
         cur.execute(
@@ -93,7 +108,10 @@ def _collect_evidence_lines(cur, items: List[Dict], max_items: int = 6) -> List[
                 "snapshot": row[1] or "",
                 "source_url": row[2] or "",
             }
+    return raw_map
 
+
+def _collect_evidence_lines(raw_map: Dict[int, Dict], items: List[Dict], max_items: int = 6) -> List[str]:
     evidence_lines: List[str] = []
     for item in items:
         if len(evidence_lines) >= max_items:
@@ -140,59 +158,83 @@ def run_factcheck_for_clusters(settings: Settings, clusters: List[Dict]) -> Dict
 
     with get_conn(settings) as conn:
         with conn.cursor() as cur:
-            for cluster in clusters:
-                cluster_id_value = cluster.get("id")
-                if isinstance(cluster_id_value, int):
-                    cluster_id_int = cluster_id_value
-                elif isinstance(cluster_id_value, str):
-                    try:
-                        cluster_id_int = int(cluster_id_value)
-                    except Exception:
-                        continue
-                else:
-                    continue
-
-                items = cluster.get("items", [])
-                evidence_lines = _collect_evidence_lines(cur, items, max_items=max_evidence)
-                if not evidence_lines:
-                    continue
-
-                prompt = _build_factcheck_prompt(cluster, evidence_lines)
-                try:
-                    response_text = llm.generate(prompt)
-                    parsed = _extract_json(response_text)
-                except Exception as e:
-                    logger.warning(f"事实核验失败: {cluster.get('id')}, {e}")
-                    parsed = {
-                        "claims": [],
-                        "evidence": [],
-                        "confidence": 0.0,
-                        "open_questions": ["事实核验失败"],
-                    }
+            raw_map = _load_raw_map(cur, clusters)
+
+    tasks: List[tuple[int, Dict, str]] = []
+    for cluster in clusters:
+        cluster_id_value = cluster.get("id")
+        if isinstance(cluster_id_value, int):
+            cluster_id_int = cluster_id_value
+        elif isinstance(cluster_id_value, str):
+            try:
+                cluster_id_int = int(cluster_id_value)
+            except Exception:
+                continue
+        else:
+            continue
+
+        items = cluster.get("items", [])
+        evidence_lines = _collect_evidence_lines(raw_map, items, max_items=max_evidence)
+        if not evidence_lines:
+            continue
+        tasks.append((cluster_id_int, cluster, _build_factcheck_prompt(cluster, evidence_lines)))
+    if not tasks:
+        return results
+
+    def _check(task: tuple[int, Dict, str]) -> Dict:
+        _, cluster, prompt = task
+        try:
+            response_text = llm.generate(prompt)
+            return _extract_json(response_text)
+        except Exception as e:
+            logger.warning(f"事实核验失败: {cluster.get('id')}, {e}")
+            return {
+                "claims": [],
+                "evidence": [],
+                "confidence": 0.0,
+                "open_questions": ["事实核验失败"],
+            }
+
+    # LLM 调用互不依赖，按 llm_max_workers 并发
+    max_workers = max(1, min(settings.llm_max_workers, len(tasks)))
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        parsed_list = list(executor.map(_check, tasks))
+
+    created_at = dt.datetime.now(dt.timezone.utc)
+    rows = []
+    statuses = []
+    for (cluster_id_int, _, _), parsed in zip(tasks, parsed_list):
+        claims = _normalize_list(parsed.get("claims"))
+        evidence = parsed.get("evidence") if isinstance(parsed.get("evidence"), list) else []
+        open_questions = _normalize_list(parsed.get("open_questions"))
+        confidence = _normalize_confidence(parsed.get("confidence"))
+
+        status = _get_status(confidence, specs.confidence_thresholds.low, specs.confidence_thresholds.high)
+        statuses.append((cluster_id_int, status, confidence))
+        rows.append((
+            "news",
+            cluster_id_int,
+            Jsonb(claims),
+            Jsonb(evidence),
+            confidence,
+            Jsonb(open_questions),
+            status,
+            created_at,
+        ))
 
-                claims = _normalize_list(parsed.get("claims"))
-                evidence = parsed.get("evidence") if isinstance(parsed.get("evidence"), list) else []
-                open_questions = _normalize_list(parsed.get("open_questions"))
-                confidence = _normalize_confidence(parsed.get("confidence"))
-
-                status = _get_status(confidence, specs.confidence_thresholds.low, specs.confidence_thresholds.high)
-                cur.execute(
-                    """
-                    INSERT INTO factchecks (topic_kind, topic_ref_id, claims, evidence, confidence, open_questions, status, created_at)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                    RETURNING id
-                    """,
-                    (
-                        "news",
-                        cluster_id_int,
-                        json.dumps(claims, ensure_ascii=False),
-                        json.dumps(evidence, ensure_ascii=False),
-                        confidence,
-                        json.dumps(open_questions, ensure_ascii=False),
-                        status,
-                        dt.datetime.now(dt.timezone.utc),
-                    ),
-                )
+    with get_conn(settings) as conn:
+        with conn.cursor() as cur:
+            cur.executemany(
+                """
+                INSERT INTO factchecks (topic_kind, topic_ref_id, claims, evidence, confidence, open_questions, status, created_at)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                RETURNING id
+                """,
+                rows,
+                returning=True,
+            )
+            # 每条语句一个结果集，与 rows 顺序一致
+            for cluster_id_int, status, confidence in statuses:
                 row = cur.fetchone()
                 if row:
                     results[cluster_id_int] = {
@@ -200,6 +242,8 @@ def run_factcheck_for_clusters(settings: Settings, clusters: List[Dict]) -> Dict
                         "status": status,
                         "confidence": confidence,
                     }
+                if not cur.nextset():
+                    break
         conn.commit()
 
     return results
@@ -1,24 +1,149 @@
 from __future__ import annotations
 
-import base64
+import binascii
+from collections import defaultdict
+import concurrent.futures
+import functools
+import hashlib
+import json
 import os
 import re
 import shutil
 import subprocess
+import threading
 import uuid
 from dataclasses import dataclass
-from datetime import datetime
-from typing import List
+from datetime import date, datetime
+from typing import Iterable, List
 from zoneinfo import ZoneInfo
 
 import logging
+from operator import itemgetter
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from .config import Settings
 
+try:
+    import ahocorasick
+except ImportError:  # pyahocorasick 为可选依赖，缺失时退回逐词子串匹配
+    ahocorasick = None
+
+try:
+    import orjson
+except ImportError:  # orjson 为可选依赖，缺失时退回标准库
+    orjson = None
+
+try:
+    import pygraphviz
+except ImportError:  # pygraphviz 为可选依赖，缺失时始终调用 dot 子进程
+    pygraphviz = None
+
 
 logger = logging.getLogger("image_generation")
 
+# 图片接口响应可能内嵌数 MB 的 base64，直接解析原始字节
+_json_loads = orjson.loads if orjson is not None else json.loads
+
+# 多张图片并发生成的线程上限（远程接口与 dot 子进程均为 IO 等待）
+IMAGE_MAX_WORKERS = 4
+# Graphviz 渲染结果按 DOT 内容哈希缓存的子目录（位于 IMAGE_OUTPUT_DIR 下）
+DIAGRAM_CACHE_DIR = ".diagram_cache"
+
+_SHANGHAI_TZ = ZoneInfo("Asia/Shanghai")
+
+# libgvc 不是线程安全的，进程内渲染需串行
+_GRAPHVIZ_LOCK = threading.Lock()
+# 按 DOT 摘要分片加锁：同批次相同流程图只渲染一次，其余槽位等待后命中缓存
+_DIAGRAM_RENDER_LOCKS = tuple(threading.Lock() for _ in range(16))
+
+_PARAGRAPH_SPLIT_RE = re.compile(r"\n\s*\n")
+_HEADING_SHORT_RE = re.compile(r"^【([^】]{1,12})】")
+_HEADING_RE = re.compile(r"^【([^】]{1,30})】")
+_SENTENCE_SPLIT_RE = re.compile(r"[。！？.!?]+")
+_FILE_NAME_UNSAFE_RE = re.compile(r"[\\/:*?\"<>|]")
+_WHITESPACE_RE = re.compile(r"\s+")
+_LEAD_PHRASE_RE = re.compile(r"^(?:(?:本文|这篇文章|研究者|团队|作者)\s*(提出|开发|发布|介绍)|我们\s*(提出|开发|发布))")
+
+# 短标签需剔除的字符：全部 Unicode 空白（与正则 \s 一致，均落在 U+3000 以内）加常见标点
+_LABEL_STRIP_TABLE = dict.fromkeys(
+    [ord(c) for c in map(chr, range(0x3001)) if c.isspace()]
+    + [ord(c) for c in ",，。.!?、;；:：()（）<>\"'“”‘’\\/"],
+)
+
+
+class _KeywordMatcher:
+    """按分组登记关键词，一次扫描文本得到各分组命中的关键词。"""
+
+    def __init__(self, groups: dict[str, Iterable[str]]) -> None:
+        self._groups = groups
+        self._automaton = None
+        if ahocorasick is not None:
+            owners: dict[str, list[str]] = {}
+            for name, keywords in groups.items():
+                for keyword in keywords:
+                    owners.setdefault(keyword, []).append(name)
+            automaton = ahocorasick.Automaton()
+            for keyword, names in owners.items():
+                automaton.add_word(keyword, (keyword, tuple(names)))
+            automaton.make_automaton()
+            self._automaton = automaton
+
+    def hits(self, text: str) -> dict[str, set[str]]:
+        result: dict[str, set[str]] = {}
+        if not text:
+            return result
+        if self._automaton is None:
+            for name, keywords in self._groups.items():
+                found = {k for k in keywords if k in text}
+                if found:
+                    result[name] = found
+            return result
+        for _, (keyword, names) in self._automaton.iter(text):
+            for name in names:
+                result.setdefault(name, set()).add(keyword)
+        return result
+
+
+_CLASSIFY_STAGE_MATCHER = _KeywordMatcher({
+    "problem": ("问题", "痛点", "挑战", "难点", "缺乏", "不足", "难以", "瓶颈"),
+    "mechanism": ("方法", "机制", "框架", "系统", "通过", "采用", "构建", "流程", "思路"),
+    "eval": ("评估", "基准", "测试", "验证", "benchmark", "对比", "指标", "实验"),
+    "outcome": ("结果", "应用", "落地", "提升", "降低", "加速", "带来", "影响"),
+})
+_CLASSIFY_STAGE_ORDER = ("problem", "mechanism", "eval", "outcome")
+
+# 简单词频评分，便于挑选更“原理导向”的句子
+_STAGE_SCORE_MATCHER = _KeywordMatcher({
+    "problem": ("问题", "挑战", "难点", "不足", "瓶颈"),
+    "mechanism": ("通过", "采用", "构建", "机制", "流程", "框架"),
+    "eval": ("评估", "测试", "验证", "基准", "对比", "指标"),
+    "outcome": ("结果", "应用", "落地", "提升", "降低", "加速"),
+})
+
+_HEADING_STAGE_MATCHER = _KeywordMatcher({
+    "happen": ("发生", "更新", "发布", "推出", "上线", "改变", "新功能"),
+    "impact": ("影响", "改变", "意义", "生活", "省时", "省钱", "效率"),
+    "how": ("体验", "上手", "使用", "入门", "变现", "赚钱", "跟上", "怎么做"),
+    "caution": ("注意", "限制", "风险", "坑", "成本", "付费", "合规"),
+})
+_HEADING_STAGE_ORDER = ("happen", "impact", "how", "caution")
+
+# 简单启发：至少包含一个动词信号，并且长度足够，避免空泛
+_ACTION_VERBS = frozenset({
+    "提出", "开发", "发布", "上线", "推出", "构建", "引入", "采用", "通过", "用于", "实现",
+    "评估", "测试", "验证", "对比", "衡量", "提升", "降低", "加速", "解决", "识别", "学习",
+    "推理", "生成", "检测", "优化", "改进", "导致", "影响", "出现", "源于", "干扰", "减少",
+})
+# 过滤过于空泛的句式
+_VAGUE_PHRASES = frozenset({"很重要", "值得关注", "带来帮助", "提升效率", "更加智能"})
+_ACTIONABLE_MATCHER = _KeywordMatcher({"verb": _ACTION_VERBS, "vague": _VAGUE_PHRASES})
+
+_CALLOUT_MATCHER = _KeywordMatcher({
+    "callout": ("门槛", "成本", "风险", "限制", "付费", "免费", "收益", "机会", "适合", "不适合", "隐私", "合规"),
+})
+
 
 @dataclass(frozen=True)
 class ImageSlot:
@@ -33,11 +158,7 @@ class ImagePlan:
     slots: List[ImageSlot]
 
 
-def _normalize_slot_type(value: str) -> str:
-    lower = value.strip().lower()
-    if lower in ("cover", "inline", "demo"):
-        return lower
-    return "inline"
+_SLOT_TYPES = frozenset({"cover", "inline", "demo"})
 
 
 def _normalize_paragraphs(value: object) -> List[str]:
@@ -47,14 +168,20 @@ def _normalize_paragraphs(value: object) -> List[str]:
         text = value.strip()
         if not text:
             return []
-        parts = re.split(r"\n\s*\n", text)
+        parts = _PARAGRAPH_SPLIT_RE.split(text)
         return [p.strip() for p in parts if p.strip()]
     return []
 
 
+# 以下纯函数的输入（小标题、要点）在同一批简报中大量重复，缓存结果避免重复扫描
+@functools.lru_cache(maxsize=1024)
 def _short_label(text: str, limit: int = 8) -> str:
-    cleaned = re.sub(r"^[【\[]|[】\]]$", "", text.strip())
-    cleaned = re.sub(r"[\s,，。.!?、;；:：()（）<>\"'“”‘’\\/]+", "", cleaned)
+    cleaned = text.strip()
+    if cleaned.startswith(("【", "[")):
+        cleaned = cleaned[1:]
+    if cleaned.endswith(("】", "]")):
+        cleaned = cleaned[:-1]
+    cleaned = cleaned.translate(_LABEL_STRIP_TABLE)
     if not cleaned:
         cleaned = text.strip()
     if len(cleaned) > limit:
@@ -65,7 +192,7 @@ def _short_label(text: str, limit: int = 8) -> str:
 def _extract_headings(paragraphs: List[str]) -> List[str]:
     headings: List[str] = []
     for paragraph in paragraphs:
-        match = re.match(r"^【([^】]{1,12})】", paragraph.strip())
+        match = _HEADING_SHORT_RE.match(paragraph.strip())
         if not match:
             continue
         label = _short_label(match.group(1))
@@ -74,59 +201,52 @@ def _extract_headings(paragraphs: List[str]) -> List[str]:
     return headings
 
 
-def _extract_heading(paragraph: str) -> str:
-    match = re.match(r"^【([^】]{1,30})】", paragraph.strip())
-    return match.group(1).strip() if match else ""
-
-
-def _strip_heading_prefix(paragraph: str) -> str:
-    return re.sub(r"^【[^】]{1,30}】\s*", "", paragraph.strip())
-
-
-def _first_sentence(paragraph: str) -> str:
-    text = _strip_heading_prefix(paragraph)
+def _parse_paragraph(paragraph: str) -> tuple[str, str]:
+    # 一次匹配同时取出【小标题】与去掉标题后的首句
+    text = paragraph.strip()
+    heading = ""
+    match = _HEADING_RE.match(text)
+    if match:
+        heading = match.group(1).strip()
+        text = text[match.end():].lstrip()
     sentences = _split_sentences(text)
-    return sentences[0] if sentences else text
-
-
+    return heading, sentences[0] if sentences else text
+
+
+_GENERIC_HEADINGS = frozenset({
+    "发生了什么",
+    "它是什么",
+    "对生活的影响",
+    "普通人如何体验",
+    "如何体验",
+    "普通人的参与",
+    "变现可能性",
+    "变现与跟进",
+    "跟上AI的做法",
+    "注意与限制",
+    "注意",
+    "限制",
+    "要点",
+    "来源",
+    "引用",
+})
+
+
+@functools.lru_cache(maxsize=1024)
 def _is_generic_heading(heading: str) -> bool:
-    generic = {
-        "发生了什么",
-        "它是什么",
-        "对生活的影响",
-        "普通人如何体验",
-        "如何体验",
-        "普通人的参与",
-        "变现可能性",
-        "变现与跟进",
-        "跟上AI的做法",
-        "注意与限制",
-        "注意",
-        "限制",
-        "要点",
-        "来源",
-        "引用",
-    }
-    cleaned = heading.strip()
-    return cleaned in generic
+    return heading.strip() in _GENERIC_HEADINGS
 
 
 def _has_actionable_content(text: str) -> bool:
     if not text:
         return False
-    # 简单启发：至少包含一个动词信号，并且长度足够，避免空泛
-    verbs = [
-        "提出", "开发", "发布", "上线", "推出", "构建", "引入", "采用", "通过", "用于", "实现",
-        "评估", "测试", "验证", "对比", "衡量", "提升", "降低", "加速", "解决", "识别", "学习",
-        "推理", "生成", "检测", "优化", "改进", "导致", "影响", "出现", "源于", "干扰", "减少",
-    ]
-    if len(text.strip()) < 8:
+    length = len(text.strip())
+    if length < 8:
         return False
-    if not any(v in text for v in verbs):
+    hits = _ACTIONABLE_MATCHER.hits(text)
+    if "verb" not in hits:
         return False
-    # 过滤过于空泛的句式
-    vague = ["很重要", "值得关注", "带来帮助", "提升效率", "更加智能"]
-    if any(v in text for v in vague) and len(text.strip()) < 16:
+    if "vague" in hits and length < 16:
         return False
     return True
 
@@ -145,8 +265,7 @@ def _build_main_label(heading: str, sentence: str) -> str | None:
         return None
 
     # 去掉显著的开场套话
-    base = re.sub(r"^(本文|这篇文章|研究者|团队|作者)\s*(提出|开发|发布|介绍)", r"\2", base)
-    base = re.sub(r"^我们\s*(提出|开发|发布)", r"\1", base)
+    base = _LEAD_PHRASE_RE.sub(lambda m: m.group(1) or m.group(2), base)
 
     # 如果小标题不是泛标题，允许作为补充，但仍以句子为主
     if heading and not _is_generic_heading(heading):
@@ -157,7 +276,7 @@ def _build_main_label(heading: str, sentence: str) -> str | None:
 
     # 压缩长度，保留可读的中文短句
     base = base.replace("（", "(").replace("）", ")")
-    base = re.sub(r"\s+", " ", base).strip()
+    base = _WHITESPACE_RE.sub(" ", base).strip()
     if len(base) > 22:
         base = base[:22]
 
@@ -166,35 +285,23 @@ def _build_main_label(heading: str, sentence: str) -> str | None:
     return _wrap_label(base, width=11)
 
 
+@functools.lru_cache(maxsize=1024)
 def _classify_stage(heading: str, sentence: str) -> str:
-    text = f"{heading} {sentence}".strip()
-    if any(k in text for k in ["问题", "痛点", "挑战", "难点", "缺乏", "不足", "难以", "瓶颈"]):
-        return "problem"
-    if any(k in text for k in ["方法", "机制", "框架", "系统", "通过", "采用", "构建", "流程", "思路"]):
-        return "mechanism"
-    if any(k in text for k in ["评估", "基准", "测试", "验证", "benchmark", "对比", "指标", "实验"]):
-        return "eval"
-    if any(k in text for k in ["结果", "应用", "落地", "提升", "降低", "加速", "带来", "影响"]):
-        return "outcome"
+    hits = _CLASSIFY_STAGE_MATCHER.hits(f"{heading} {sentence}".strip())
+    for stage in _CLASSIFY_STAGE_ORDER:
+        if stage in hits:
+            return stage
     return "other"
 
 
 def _score_stage_candidate(stage: str, text: str) -> int:
-    # 简单词频评分，便于挑选更“原理导向”的句子
-    weights = {
-        "problem": ["问题", "挑战", "难点", "不足", "瓶颈"],
-        "mechanism": ["通过", "采用", "构建", "机制", "流程", "框架"],
-        "eval": ["评估", "测试", "验证", "基准", "对比", "指标"],
-        "outcome": ["结果", "应用", "落地", "提升", "降低", "加速"],
-    }
-    keywords = weights.get(stage, [])
-    return sum(1 for k in keywords if k in text)
+    return len(_STAGE_SCORE_MATCHER.hits(text).get(stage, ()))
 
 
 def _split_sentences(text: str) -> List[str]:
     if not text:
         return []
-    parts = re.split(r"[。！？.!?]+", text.strip())
+    parts = _SENTENCE_SPLIT_RE.split(text.strip())
     return [p.strip() for p in parts if p.strip()]
 
 
@@ -215,20 +322,23 @@ def normalize_image_plan(value: object, max_count: int) -> ImagePlan:
 
     slots: List[ImageSlot] = []
     raw_slots = value.get("slots")
-    if isinstance(raw_slots, list):
-        for item in raw_slots:
-            if not isinstance(item, dict):
-                continue
-            slot_type = _normalize_slot_type(str(item.get("type", "inline")))
-            prompt = str(item.get("prompt", "")).strip()
-            diagram_spec = item.get("diagram")
-            if not isinstance(diagram_spec, dict):
-                diagram_spec = item.get("diagram_spec")
-            if not isinstance(diagram_spec, dict):
-                diagram_spec = None
-            if not prompt and not diagram_spec:
-                continue
-            slots.append(ImageSlot(slot_type=slot_type, prompt=prompt, diagram_spec=diagram_spec))
+    if not isinstance(raw_slots, list):
+        raw_slots = ()
+    for item in raw_slots:
+        if not isinstance(item, dict):
+            continue
+        slot_type = str(item.get("type", "inline")).strip().lower()
+        if slot_type not in _SLOT_TYPES:
+            slot_type = "inline"
+        prompt = str(item.get("prompt", "")).strip()
+        diagram_spec = item.get("diagram")
+        if not isinstance(diagram_spec, dict):
+            diagram_spec = item.get("diagram_spec")
+        if not isinstance(diagram_spec, dict):
+            diagram_spec = None
+        if not prompt and not diagram_spec:
+            continue
+        slots.append(ImageSlot(slot_type=slot_type, prompt=prompt, diagram_spec=diagram_spec))
 
     if count <= 0 and slots:
         count = len(slots)
@@ -243,15 +353,20 @@ def _ensure_dir(path: str) -> None:
     os.makedirs(path, exist_ok=True)
 
 
+@functools.lru_cache(maxsize=8)
+def _format_date_dir(output_dir: str, date_format: str, day: date) -> str:
+    return os.path.join(output_dir, day.strftime(date_format))
+
+
 def _get_date_dir(settings: Settings) -> str:
-    tz = ZoneInfo("Asia/Shanghai")
-    date_str = datetime.now(tz).strftime(settings.feishu_doc_date_format)
-    return os.path.join(settings.image_output_dir, date_str)
+    # 目录只随日期变化：按当天日期缓存格式化结果，跨天自动落到新的缓存键
+    today = datetime.now(_SHANGHAI_TZ).date()
+    return _format_date_dir(settings.image_output_dir, settings.feishu_doc_date_format, today)
 
 
 def _sanitize_file_name(text: str) -> str:
-    cleaned = re.sub(r"[\\/:*?\"<>|]", "", text)
-    cleaned = re.sub(r"\s+", " ", cleaned).strip()
+    cleaned = _FILE_NAME_UNSAFE_RE.sub("", text)
+    cleaned = _WHITESPACE_RE.sub(" ", cleaned).strip()
     return cleaned[:40] if len(cleaned) > 40 else cleaned
 
 
@@ -260,7 +375,12 @@ def _build_image_name(title: str, index: int) -> str:
     return f"{base}{index:02d}.png"
 
 
-def _save_image_bytes(directory: str, content: bytes, file_name: str) -> str:
+def _decode_base64_image(raw: str) -> bytes:
+    # binascii 直接读取 ASCII 字符串的内部缓冲区；base64.b64decode 会先 encode 出一份等长副本
+    return binascii.a2b_base64(raw)
+
+
+def _save_image_bytes(directory: str, content: bytes | bytearray | memoryview, file_name: str) -> str:
     _ensure_dir(directory)
     file_path = os.path.join(directory, file_name)
     with open(file_path, "wb") as f:
@@ -268,13 +388,38 @@ def _save_image_bytes(directory: str, content: bytes, file_name: str) -> str:
     return file_path
 
 
+def _build_session() -> requests.Session:
+    # 图片接口与下载共用连接池，多张图片之间复用 TCP/TLS 连接
+    retry = Retry(total=2, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504], raise_on_status=False)
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+_HTTP_SESSION = _build_session()
+
+
+def _json_dumps(value: object) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, ensure_ascii=False).encode("utf-8")
+
+
 def _download_image(url: str, directory: str, file_name: str) -> str | None:
     try:
-        resp = requests.get(url, timeout=60)
-        if resp.status_code >= 400:
-            logger.warning(f"图片下载失败: {resp.status_code}")
-            return None
-        return _save_image_bytes(directory, resp.content, file_name)
+        with _HTTP_SESSION.get(url, timeout=60, stream=True) as resp:
+            if resp.status_code >= 400:
+                logger.warning(f"图片下载失败: {resp.status_code}")
+                return None
+            _ensure_dir(directory)
+            file_path = os.path.join(directory, file_name)
+            # 分块写盘，避免整张图片先读入内存
+            resp.raw.decode_content = True
+            with open(file_path, "wb") as f:
+                shutil.copyfileobj(resp.raw, f, length=65536)
+            return file_path
     except Exception:
         return None
 
@@ -300,11 +445,11 @@ def _generate_image_glm(settings: Settings, prompt: str, file_name: str) -> tupl
         "prompt": prompt,
         "size": settings.image_size,
     }
-    resp = requests.post(url, json=payload, headers=headers, timeout=settings.llm_timeout_seconds)
+    resp = _HTTP_SESSION.post(url, data=_json_dumps(payload), headers=headers, timeout=settings.llm_timeout_seconds)
     if resp.status_code >= 400:
         logger.warning(f"图片生成失败: {resp.status_code} {resp.text}")
         return None, None
-    data = resp.json()
+    data = _json_loads(resp.content)
     items = data.get("data") if isinstance(data, dict) else None
     if not isinstance(items, list) or not items:
         logger.warning(f"图片生成失败: 返回数据为空 {data}")
@@ -315,7 +460,7 @@ def _generate_image_glm(settings: Settings, prompt: str, file_name: str) -> tupl
     if isinstance(item, dict) and "b64_json" in item:
         raw = item.get("b64_json")
         if isinstance(raw, str) and raw:
-            content = base64.b64decode(raw)
+            content = _decode_base64_image(raw)
             path = _save_image_bytes(_get_date_dir(settings), content, file_name)
             return None, path
     logger.warning(f"图片生成失败: 返回数据格式不支持 {item}")
@@ -346,11 +491,11 @@ def _generate_image_google(settings: Settings, prompt: str, file_name: str) -> t
             "sampleCount": 1,
         },
     }
-    resp = requests.post(url, headers=headers, json=payload, timeout=settings.llm_timeout_seconds)
+    resp = _HTTP_SESSION.post(url, headers=headers, data=_json_dumps(payload), timeout=settings.llm_timeout_seconds)
     if resp.status_code >= 400:
         logger.warning(f"图片生成失败: {resp.status_code} {resp.text}")
         return None, None
-    data = resp.json()
+    data = _json_loads(resp.content)
     predictions = data.get("predictions") if isinstance(data, dict) else None
     if not isinstance(predictions, list) or not predictions:
         logger.warning(f"图片生成失败: 返回数据为空 {data}")
@@ -360,7 +505,7 @@ def _generate_image_google(settings: Settings, prompt: str, file_name: str) -> t
     if isinstance(item, dict):
         raw = item.get("bytesBase64Encoded") or item.get("imageBytes")
     if isinstance(raw, str) and raw:
-        content = base64.b64decode(raw)
+        content = _decode_base64_image(raw)
         path = _save_image_bytes(_get_date_dir(settings), content, file_name)
         return None, path
     logger.warning(f"图片生成失败: 返回数据格式不支持 {item}")
@@ -375,21 +520,26 @@ def _generate_image(settings: Settings, prompt: str, file_name: str) -> tuple[st
     return _generate_image_glm(settings, prompt, file_name)
 
 
+_DOT_ESCAPE_TABLE = str.maketrans({"\\": "\\\\", "\"": "\\\"", "\n": "\\n"})
+
+
 def _escape_dot_text(text: str) -> str:
-    return text.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+    return text.translate(_DOT_ESCAPE_TABLE)
+
+
+_NODE_SHAPES = {
+    "start": "ellipse",
+    "end": "ellipse",
+    "decision": "diamond",
+    "data": "parallelogram",
+    "process": "box",
+    "note": "note",
+}
 
 
+@functools.lru_cache(maxsize=1024)
 def _node_shape(node_type: str) -> str:
-    normalized = node_type.strip().lower()
-    shape_map = {
-        "start": "ellipse",
-        "end": "ellipse",
-        "decision": "diamond",
-        "data": "parallelogram",
-        "process": "box",
-        "note": "note",
-    }
-    return shape_map.get(normalized, "box")
+    return _NODE_SHAPES.get(node_type.strip().lower(), "box")
 
 
 def _title_text(raw_title: str) -> str:
@@ -409,6 +559,13 @@ def _node_kind(node: dict[str, object]) -> str:
     return "main"
 
 
+def _node_id(node: dict[str, object], idx: int) -> str:
+    # 仅在缺少 id/name 时才生成兜底编号
+    raw = node.get("id") or node.get("name")
+    node_id = str(raw).strip() if raw else ""
+    return node_id or f"n{idx}"
+
+
 def _node_group(node: dict[str, object]) -> str:
     value = str(node.get("group") or "").strip()
     return value
@@ -429,6 +586,31 @@ def _gradient(fill_left: str, fill_right: str) -> str:
     return f"{fill_left}:{fill_right}"
 
 
+# 图头部固定属性：{font} 为已转义的字体名
+_GRAPH_HEADER_TEMPLATE = "\n".join([
+    "digraph G {{",
+    "  rankdir={rankdir};",
+    "  splines=ortho;",
+    "  nodesep=0.40;",
+    "  ranksep=0.65;",
+    "  pad=0.25;",
+    "  bgcolor=\"#F8FAFC:#ECFEFF\";",
+    "  gradientangle=135;",
+    "  graph [charset=\"UTF-8\", fontname=\"{font}\", labelloc=\"t\", fontsize=20, fontcolor=\"#0F172A\", style=\"filled\"];",
+    "  node [fontname=\"{font}\", style=\"rounded,filled\", color=\"#94A3B8\", fontcolor=\"#0F172A\", fillcolor=\"#E2E8F0\", fontsize=14, penwidth=1.2];",
+    "  edge [fontname=\"{font}\", color=\"#64748B\", fontcolor=\"#334155\", fontsize=12, penwidth=1.3, arrowsize=0.8];",
+])
+
+# 节点样式模板：{eid}/{label} 为已转义的 id 与文本
+_NODE_VARIANT_TEMPLATES = {
+    "title": "    \"{eid}\" [label=\"{label}\", shape=\"box\", style=\"rounded,filled\", fillcolor=\"" + _gradient("#E0F2FE", "#E9D5FF") + "\", gradientangle=0, color=\"#7C3AED\", fontsize=18, penwidth=1.4, fontcolor=\"#0F172A\"];",
+    "header": "    \"{eid}\" [label=\"{label}\", shape=\"box\", style=\"rounded,filled\", fillcolor=\"" + _gradient("#C7D2FE", "#D8B4FE") + "\", gradientangle=0, color=\"#7C3AED\", fontsize=13, penwidth=1.2];",
+    "pill": "    \"{eid}\" [label=\"{label}\", shape=\"box\", style=\"rounded,filled\", fillcolor=\"" + _gradient("#BAE6FD", "#BBF7D0") + "\", gradientangle=0, color=\"#0EA5E9\", fontsize=14, penwidth=1.2];",
+}
+_NODE_CALLOUT_TEMPLATE = "    \"{eid}\" [label=\"{label}\", shape=\"{shape}\", style=\"filled\", fillcolor=\"#FEF3C7\", color=\"#F59E0B\", fontsize=12, penwidth=1.1];"
+_NODE_DEFAULT_TEMPLATE = "    \"{eid}\" [label=\"{label}\", shape=\"{shape}\", fillcolor=\"{fill}\"];"
+
+
 def _pick_main_chain_labels(labels: List[str], max_items: int) -> List[str]:
     # 保留：旧逻辑已不再使用，避免破坏外部引用
     return labels[:max_items]
@@ -442,33 +624,17 @@ def _pick_examples(points: List[str], keywords: List[str], max_items: int) -> Li
             continue
         if any(k in text for k in keywords):
             candidates.append(text)
-    if not candidates:
-        return []
-    result: List[str] = []
-    seen: set[str] = set()
-    for item in candidates:
-        label = _short_label(item, limit=10)
-        if not label or label in seen:
-            continue
-        seen.add(label)
-        result.append(label)
-        if len(result) >= max_items:
-            break
-    return result
+    # dict 保持插入顺序，一次完成有序去重
+    labels = (_short_label(item, limit=10) for item in candidates)
+    return list(dict.fromkeys(label for label in labels if label))[:max_items]
 
 
+@functools.lru_cache(maxsize=1024)
 def _stage_from_heading(heading: str) -> str:
-    text = heading.strip()
-    if not text:
-        return "other"
-    if any(key in text for key in ["发生", "更新", "发布", "推出", "上线", "改变", "新功能"]):
-        return "happen"
-    if any(key in text for key in ["影响", "改变", "意义", "生活", "省时", "省钱", "效率"]):
-        return "impact"
-    if any(key in text for key in ["体验", "上手", "使用", "入门", "变现", "赚钱", "跟上", "怎么做"]):
-        return "how"
-    if any(key in text for key in ["注意", "限制", "风险", "坑", "成本", "付费", "合规"]):
-        return "caution"
+    hits = _HEADING_STAGE_MATCHER.hits(heading.strip())
+    for stage in _HEADING_STAGE_ORDER:
+        if stage in hits:
+            return stage
     return "other"
 
 
@@ -484,30 +650,20 @@ def _group_title_for_stage(stage: str) -> str:
 
 
 def _pick_callouts(summary: str, points: List[str], max_items: int) -> List[str]:
-    keywords = ["门槛", "成本", "风险", "限制", "付费", "免费", "收益", "机会", "适合", "不适合", "隐私", "合规"]
     candidates: List[str] = []
     for p in points:
         text = str(p).strip()
         if not text:
             continue
-        if any(k in text for k in keywords):
+        if _CALLOUT_MATCHER.hits(text):
             candidates.append(text)
     if len(candidates) < max_items:
         for sentence in _split_sentences(summary):
-            if any(k in sentence for k in keywords):
+            if _CALLOUT_MATCHER.hits(sentence):
                 candidates.append(sentence)
 
-    dedup: List[str] = []
-    seen: set[str] = set()
-    for item in candidates:
-        label = _short_label(item, limit=14)
-        if not label or label in seen:
-            continue
-        seen.add(label)
-        dedup.append(label)
-        if len(dedup) >= max_items:
-            break
-    return dedup
+    labels = (_short_label(item, limit=14) for item in candidates)
+    return list(dict.fromkeys(label for label in labels if label))[:max_items]
 
 
 def _build_graphviz_dot(diagram_spec: dict[str, object], title: str, font_name: str) -> str:
@@ -516,19 +672,8 @@ def _build_graphviz_dot(diagram_spec: dict[str, object], title: str, font_name:
         layout = "TB"
     rankdir = "LR" if layout == "LR" else "TB"
 
-    lines = [
-        "digraph G {",
-        f"  rankdir={rankdir};",
-        "  splines=ortho;",
-        "  nodesep=0.40;",
-        "  ranksep=0.65;",
-        "  pad=0.25;",
-        "  bgcolor=\"#F8FAFC:#ECFEFF\";",
-        "  gradientangle=135;",
-        f"  graph [charset=\"UTF-8\", fontname=\"{_escape_dot_text(font_name)}\", labelloc=\"t\", fontsize=20, fontcolor=\"#0F172A\", style=\"filled\"];",
-        f"  node [fontname=\"{_escape_dot_text(font_name)}\", style=\"rounded,filled\", color=\"#94A3B8\", fontcolor=\"#0F172A\", fillcolor=\"#E2E8F0\", fontsize=14, penwidth=1.2];",
-        f"  edge [fontname=\"{_escape_dot_text(font_name)}\", color=\"#64748B\", fontcolor=\"#334155\", fontsize=12, penwidth=1.3, arrowsize=0.8];",
-    ]
+    font = _escape_dot_text(font_name)
+    lines = [_GRAPH_HEADER_TEMPLATE.format(rankdir=rankdir, font=font)]
 
     has_title_node = bool(diagram_spec.get("title_node"))
     if title and not has_title_node:
@@ -538,61 +683,32 @@ def _build_graphviz_dot(diagram_spec: dict[str, object], title: str, font_name:
     edges = diagram_spec.get("edges")
     groups = diagram_spec.get("groups") or diagram_spec.get("clusters")
 
-    node_list: list[dict[str, object]] = []
-    if isinstance(nodes, list):
-        for node in nodes:
-            if isinstance(node, dict):
-                node_list.append(node)
+    node_list: list[dict[str, object]] = [n for n in nodes if isinstance(n, dict)] if isinstance(nodes, list) else []
 
-    group_nodes: dict[str, list[dict[str, object]]] = {}
+    group_nodes: defaultdict[str, list[dict[str, object]]] = defaultdict(list)
     for node in node_list:
-        group_id = _node_group(node)
-        if not group_id:
-            group_id = "__default__"
-        group_nodes.setdefault(group_id, []).append(node)
+        group_nodes[_node_group(node) or "__default__"].append(node)
 
     def render_node(node_id: str, node: dict[str, object], idx: int) -> None:
         label = str(node.get("label") or node_id).strip()
-        node_type = str(node.get("type") or "process")
-        shape = _node_shape(node_type)
-        kind = _node_kind(node)
-        stage = str(node.get("stage") or "other")
         variant = str(node.get("variant") or "").strip().lower()
+        eid = _escape_dot_text(node_id)
+        elabel = _escape_dot_text(label)
 
-        if variant == "title":
-            lines.append(
-                f"    \"{_escape_dot_text(node_id)}\" [label=\"{_escape_dot_text(label)}\", shape=\"box\", style=\"rounded,filled\", fillcolor=\"{_gradient('#E0F2FE', '#E9D5FF')}\", gradientangle=0, color=\"#7C3AED\", fontsize=18, penwidth=1.4, fontcolor=\"#0F172A\"];"
-            )
-            return
-
-        if variant == "header":
-            lines.append(
-                f"    \"{_escape_dot_text(node_id)}\" [label=\"{_escape_dot_text(label)}\", shape=\"box\", style=\"rounded,filled\", fillcolor=\"{_gradient('#C7D2FE', '#D8B4FE')}\", gradientangle=0, color=\"#7C3AED\", fontsize=13, penwidth=1.2];"
-            )
+        template = _NODE_VARIANT_TEMPLATES.get(variant)
+        if template:
+            lines.append(template.format(eid=eid, label=elabel))
             return
 
-        if variant == "pill":
-            lines.append(
-                f"    \"{_escape_dot_text(node_id)}\" [label=\"{_escape_dot_text(label)}\", shape=\"box\", style=\"rounded,filled\", fillcolor=\"{_gradient('#BAE6FD', '#BBF7D0')}\", gradientangle=0, color=\"#0EA5E9\", fontsize=14, penwidth=1.2];"
-            )
-            return
-
-        if kind == "callout":
-            lines.append(
-                f"    \"{_escape_dot_text(node_id)}\" [label=\"{_escape_dot_text(label)}\", shape=\"{shape}\", style=\"filled\", fillcolor=\"#FEF3C7\", color=\"#F59E0B\", fontsize=12, penwidth=1.1];"
-            )
+        shape = _node_shape(str(node.get("type") or "process"))
+        if _node_kind(node) == "callout":
+            lines.append(_NODE_CALLOUT_TEMPLATE.format(eid=eid, label=elabel, shape=shape))
             return
-        fill = _stage_color(stage)
-        lines.append(
-            f"    \"{_escape_dot_text(node_id)}\" [label=\"{_escape_dot_text(label)}\", shape=\"{shape}\", fillcolor=\"{fill}\"];"
-        )
+        fill = _stage_color(str(node.get("stage") or "other"))
+        lines.append(_NODE_DEFAULT_TEMPLATE.format(eid=eid, label=elabel, shape=shape, fill=fill))
 
     # render groups as clusters
-    group_meta: list[dict[str, object]] = []
-    if isinstance(groups, list):
-        for group in groups:
-            if isinstance(group, dict):
-                group_meta.append(group)
+    group_meta: list[dict[str, object]] = [g for g in groups if isinstance(g, dict)] if isinstance(groups, list) else []
 
     group_label_by_id: dict[str, str] = {}
     for group in group_meta:
@@ -614,11 +730,11 @@ def _build_graphviz_dot(diagram_spec: dict[str, object], title: str, font_name:
         lines.append("    penwidth=1.1;")
         lines.append(f"    label=\"{_escape_dot_text(group_label)}\";")
         lines.append("    fontcolor=\"#334155\";")
-        lines.append(f"    fontname=\"{_escape_dot_text(font_name)}\";")
+        lines.append(f"    fontname=\"{font}\";")
         lines.append("    fontsize=13;")
         for node in nodes_in_group:
             idx_counter += 1
-            node_id = str(node.get("id") or node.get("name") or f"n{idx_counter}").strip() or f"n{idx_counter}"
+            node_id = _node_id(node, idx_counter)
             rendered_node_ids.add(node_id)
             render_node(node_id, node, idx_counter)
         lines.append("  }")
@@ -627,7 +743,7 @@ def _build_graphviz_dot(diagram_spec: dict[str, object], title: str, font_name:
     if "__default__" in group_nodes:
         for node in group_nodes["__default__"]:
             idx_counter += 1
-            node_id = str(node.get("id") or node.get("name") or f"n{idx_counter}").strip() or f"n{idx_counter}"
+            node_id = _node_id(node, idx_counter)
             if node_id in rendered_node_ids:
                 continue
             render_node(node_id, node, idx_counter)
@@ -644,11 +760,7 @@ def _build_graphviz_dot(diagram_spec: dict[str, object], title: str, font_name:
             quoted = " ".join([f"\"{_escape_dot_text(v)}\"" for v in items])
             lines.append(f"  {{ rank=same; {quoted}; }}")
 
-    edge_list: list[dict[str, object]] = []
-    if isinstance(edges, list):
-        for edge in edges:
-            if isinstance(edge, dict):
-                edge_list.append(edge)
+    edge_list: list[dict[str, object]] = [e for e in edges if isinstance(e, dict)] if isinstance(edges, list) else []
 
     for edge in edge_list:
         source = str(edge.get("from") or "").strip()
@@ -683,30 +795,89 @@ def _render_graphviz_image(
     directory: str,
     file_name: str,
 ) -> str | None:
+    font_name = settings.graphviz_font or "Noto Sans CJK SC"
+    dot_bytes = _build_graphviz_dot(diagram_spec, title, font_name).encode("utf-8")
+    _ensure_dir(directory)
+    output_path = os.path.join(directory, file_name)
+
+    # 相同 DOT 内容渲染结果一致，命中缓存时直接复制，跳过 dot 子进程
+    digest = hashlib.blake2b(dot_bytes, digest_size=16).hexdigest()
+    cache_path = os.path.join(settings.image_output_dir, DIAGRAM_CACHE_DIR, f"{digest}.png")
+    with _DIAGRAM_RENDER_LOCKS[int(digest[:8], 16) % len(_DIAGRAM_RENDER_LOCKS)]:
+        return _render_dot_cached(settings, dot_bytes, output_path, cache_path)
+
+
+def _render_dot_cached(settings: Settings, dot_bytes: bytes, output_path: str, cache_path: str) -> str | None:
+    if os.path.exists(cache_path):
+        try:
+            shutil.copyfile(cache_path, output_path)
+            return output_path
+        except OSError as e:
+            logger.warning(f"Graphviz 缓存读取失败: {e}")
+
+    if settings.graphviz_inprocess and pygraphviz is not None and _render_dot_inprocess(dot_bytes, output_path):
+        _store_diagram_cache(output_path, cache_path)
+        return output_path
+
     dot_path = shutil.which("dot")
     if not dot_path:
         logger.warning("Graphviz 未安装，跳过图像生成")
         return None
-    font_name = settings.graphviz_font or "Noto Sans CJK SC"
-    dot_content = _build_graphviz_dot(diagram_spec, title, font_name)
-    _ensure_dir(directory)
-    output_path = os.path.join(directory, file_name)
     try:
-        subprocess.run(
+        # stdout 直接丢弃，只收集 stderr 以便记录 dot 的报错原因
+        with subprocess.Popen(
             [dot_path, "-Tpng", "-o", output_path],
-            input=dot_content.encode("utf-8"),
-            check=True,
-            timeout=30,
-        )
+            stdin=subprocess.PIPE,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+        ) as proc:
+            try:
+                _, stderr = proc.communicate(dot_bytes, timeout=30)
+            except subprocess.TimeoutExpired:
+                # 与 subprocess.run 一致：超时只 kill + wait，孙进程可能仍占着管道
+                proc.kill()
+                proc.wait()
+                raise
+        if proc.returncode:
+            raise RuntimeError(f"dot 退出码 {proc.returncode}: {stderr.decode('utf-8', 'replace').strip()}")
     except Exception as e:
         logger.warning(f"Graphviz 生成失败: {e}")
         return None
     if not os.path.exists(output_path):
         logger.warning("Graphviz 输出文件缺失")
         return None
+    _store_diagram_cache(output_path, cache_path)
     return output_path
 
 
+def _render_dot_inprocess(dot_bytes: bytes, output_path: str) -> bool:
+    # 进程内加载 libgvc 布局并输出，省去每张图 fork/exec dot；失败时由调用方回退子进程
+    try:
+        with _GRAPHVIZ_LOCK:
+            graph = pygraphviz.AGraph(string=dot_bytes.decode("utf-8"))
+            graph.draw(output_path, format="png", prog="dot")
+    except Exception as e:
+        logger.warning(f"Graphviz 进程内渲染失败，改用 dot 子进程: {e}")
+        return False
+    return os.path.exists(output_path)
+
+
+def _store_diagram_cache(output_path: str, cache_path: str) -> None:
+    # 复制而非硬链接：输出文件之后可能被同名覆盖写入，不能牵连缓存
+    # 先写临时文件再原子替换，并发渲染同一张图时不会读到半个文件
+    tmp_path = f"{cache_path}.{uuid.uuid4().hex}.tmp"
+    try:
+        _ensure_dir(os.path.dirname(cache_path))
+        shutil.copyfile(output_path, tmp_path)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        logger.warning(f"Graphviz 缓存写入失败: {e}")
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+
 def build_graphviz_plan_from_content(
     content: dict[str, object],
     title: str,
@@ -728,10 +899,9 @@ def build_graphviz_plan_from_content(
     point_list = points_list
 
     # 原理导向：输入/前提 -> 机制/方法 -> 评估/验证 -> 结果/影响
-    candidates: List[dict[str, str]] = []
+    candidates: List[dict[str, str | int]] = []
     for paragraph in body:
-        heading = _extract_heading(paragraph)
-        sentence = _first_sentence(paragraph)
+        heading, sentence = _parse_paragraph(paragraph)
         label = _build_main_label(heading, sentence)
         if not label:
             continue
@@ -741,19 +911,25 @@ def build_graphviz_plan_from_content(
             "stage": stage,
             "label": label,
             "raw": f"{heading} {sentence}".strip(),
-            "score": str(score),
+            "score": score,
         })
 
     if len(candidates) < 3:
         return ImagePlan(count=0, slots=[])
 
-    stage_order = ["problem", "mechanism", "eval", "outcome"]
-    picked: List[dict[str, str]] = []
+    # 单次遍历按阶段分桶，每个阶段只对自己的桶排序（稳定排序，同分保持段落顺序）
+    buckets: dict[str, List[dict[str, str | int]]] = {stage: [] for stage in _CLASSIFY_STAGE_ORDER}
+    for c in candidates:
+        bucket = buckets.get(c["stage"])
+        if bucket is not None:
+            bucket.append(c)
+
+    picked: List[dict[str, str | int]] = []
     used_labels: set[str] = set()
-    for stage in stage_order:
-        stage_items = [c for c in candidates if c["stage"] == stage]
-        stage_items.sort(key=lambda x: int(x.get("score") or "0"), reverse=True)
-        for item in stage_items:
+    for stage in _CLASSIFY_STAGE_ORDER:
+        bucket = buckets[stage]
+        bucket.sort(key=itemgetter("score"), reverse=True)
+        for item in bucket:
             if item["label"] in used_labels:
                 continue
             used_labels.add(item["label"])
@@ -865,22 +1041,23 @@ def build_graphviz_plan_from_content(
             {"id": how_id, "label": "如何体验", "type": "box", "variant": "header", "kind": "main", "stage": "how", "group": "people"},
             {"id": money_id, "label": "跟进与机会", "type": "box", "variant": "header", "kind": "main", "stage": "how", "group": "people"},
         ])
-        edges.append({"from": people_header, "to": how_id, "label": "", "kind": "main"})
-        edges.append({"from": people_header, "to": money_id, "label": "", "kind": "main"})
         ranks.append([how_id, money_id])
-        people_nodes.extend([how_id, money_id])
 
         exp_id = "p3"
         exp_label = people_examples[0]
-        nodes.append({"id": exp_id, "label": _wrap_label(exp_label, width=12), "type": "box", "variant": "pill", "kind": "main", "stage": "how", "group": "people"})
-        edges.append({"from": how_id, "to": exp_id, "label": "", "kind": "main"})
-        people_nodes.append(exp_id)
-
         mon_id = "p4"
         mon_label = people_examples[1] if len(people_examples) > 1 else "关注学习/社区"
-        nodes.append({"id": mon_id, "label": _wrap_label(mon_label, width=12), "type": "box", "variant": "pill", "kind": "main", "stage": "how", "group": "people"})
-        edges.append({"from": money_id, "to": mon_id, "label": "", "kind": "main"})
-        people_nodes.append(mon_id)
+        nodes.extend([
+            {"id": exp_id, "label": _wrap_label(exp_label, width=12), "type": "box", "variant": "pill", "kind": "main", "stage": "how", "group": "people"},
+            {"id": mon_id, "label": _wrap_label(mon_label, width=12), "type": "box", "variant": "pill", "kind": "main", "stage": "how", "group": "people"},
+        ])
+        edges.extend([
+            {"from": people_header, "to": how_id, "label": "", "kind": "main"},
+            {"from": people_header, "to": money_id, "label": "", "kind": "main"},
+            {"from": how_id, "to": exp_id, "label": "", "kind": "main"},
+            {"from": money_id, "to": mon_id, "label": "", "kind": "main"},
+        ])
+        people_nodes.extend([how_id, money_id, exp_id, mon_id])
         groups.append({"id": "people", "label": "普通人的参与", "nodes": people_nodes})
 
     # 旁注只放“门槛/成本/风险/收益”中具体的一两条
@@ -898,31 +1075,42 @@ def build_graphviz_plan_from_content(
     return ImagePlan(count=min(1, max_count), slots=[slot])
 
 
+def _generate_slot_image(settings: Settings, slot: ImageSlot, title: str, directory: str, idx: int) -> dict | None:
+    file_name = _build_image_name(title, idx)
+    url = None
+    path = None
+    if slot.diagram_spec:
+        path = _render_graphviz_image(settings, slot.diagram_spec, title, directory, file_name)
+    if not path and slot.prompt:
+        url, path = _generate_image(settings, slot.prompt, file_name)
+    if url and not path:
+        downloaded = _download_image(url, directory, file_name)
+        path = downloaded
+    if not path and not url:
+        logger.warning(f"图片生成失败: prompt={slot.prompt}")
+        return None
+    return {
+        "slot": slot.slot_type,
+        "prompt": slot.prompt,
+        "diagram": slot.diagram_spec,
+        "url": url,
+        "path": path,
+    }
+
+
 def generate_images(settings: Settings, plan: ImagePlan, title: str) -> List[dict]:
     if not settings.image_prompt_enabled or plan.count <= 0:
         return []
 
     directory = _get_date_dir(settings)
-    images: List[dict] = []
-    for idx, slot in enumerate(plan.slots[:plan.count], start=1):
-        file_name = _build_image_name(title, idx)
-        url = None
-        path = None
-        if slot.diagram_spec:
-            path = _render_graphviz_image(settings, slot.diagram_spec, title, directory, file_name)
-        if not path and slot.prompt:
-            url, path = _generate_image(settings, slot.prompt, file_name)
-        if url and not path:
-            downloaded = _download_image(url, directory, file_name)
-            path = downloaded
-        if not path and not url:
-            logger.warning(f"图片生成失败: prompt={slot.prompt}")
-            continue
-        images.append({
-            "slot": slot.slot_type,
-            "prompt": slot.prompt,
-            "diagram": slot.diagram_spec,
-            "url": url,
-            "path": path,
-        })
-    return images
+    slots = plan.slots[:plan.count]
+    if len(slots) == 1:
+        results = [_generate_slot_image(settings, slots[0], title, directory, 1)]
+    else:
+        # 各槽位互不依赖，并发执行以重叠网络与子进程等待；map 保持原有顺序
+        with concurrent.futures.ThreadPoolExecutor(max_workers=min(len(slots), IMAGE_MAX_WORKERS)) as executor:
+            results = list(executor.map(
+                lambda pair: _generate_slot_image(settings, pair[1], title, directory, pair[0]),
+                enumerate(slots, start=1),
+            ))
+    return [image for image in results if image]
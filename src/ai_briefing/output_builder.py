@@ -1,64 +1,101 @@
 from __future__ import annotations
 
+import functools
 import json
 import re
-from typing import Dict, List
+from typing import Dict, Iterable, List
 
 from .branch_specs import BranchSpecs
 
+_BOLD_RE = re.compile(r"\*\*(.*?)\*\*")
+_CODE_RE = re.compile(r"`([^`]+)`")
+_SENTENCE_SPLIT_RE = re.compile(r"(?<=[。！？.!?])\s+")
+_PARAGRAPH_SPLIT_RE = re.compile(r"\n\s*\n")
+# json.loads 可接受的文档首字符（含 NaN/Infinity 扩展）
+_JSON_START_CHARS = frozenset('[{"-0123456789tfnNI')
+
+
+def _clean_strs(values: Iterable[object], limit: int | None = None) -> List[str]:
+    # 每项只做一次 str()+strip()，丢弃空白项；给定 limit 时凑够即停止迭代
+    out: List[str] = []
+    if limit is not None and limit <= 0:
+        return out
+    for v in values:
+        text = str(v).strip()
+        if text:
+            out.append(text)
+            if len(out) == limit:
+                break
+    return out
+
 
 def _normalize_links(value: object) -> List[str]:
     if isinstance(value, list):
-        return [str(v).strip() for v in value if str(v).strip()]
+        return _clean_strs(value)
     if isinstance(value, str):
+        # 普通 URL 不可能是合法 JSON：首字符不符合 JSON 开头时跳过解析与异常开销
+        if value.lstrip(" \t\n\r")[:1] not in _JSON_START_CHARS:
+            return [value.strip()] if value.strip() else []
         try:
             parsed = json.loads(value)
         except Exception:
             return [value.strip()] if value.strip() else []
         if isinstance(parsed, list):
-            return [str(v).strip() for v in parsed if str(v).strip()]
+            return _clean_strs(parsed)
     return []
 
 
 def _strip_markdown(text: str) -> str:
     if not text:
         return ""
-    text = re.sub(r"\*\*(.*?)\*\*", r"\1", text)
-    text = re.sub(r"`([^`]+)`", r"\1", text)
+    # 多数摘要不含 markdown：先用子串判断跳过整趟正则扫描
+    if "**" in text:
+        text = _BOLD_RE.sub(r"\1", text)
+    if "`" in text:
+        text = _CODE_RE.sub(r"\1", text)
     return text.strip()
 
 
 def _split_sentences(text: str) -> List[str]:
     if not text:
         return []
-    parts = re.split(r"(?<=[。！？.!?])\s+", text.strip())
+    parts = _SENTENCE_SPLIT_RE.split(text.strip())
     return [p.strip() for p in parts if p.strip()]
 
 
-def _format_list(lines: List[str]) -> str:
-    if not lines:
-        return ""
-    return "\n".join([f"- {line}" for line in lines])
+def _emit_block(out: List[str], block: str) -> None:
+    # 逐行累积，段落之间插入空行，最终只做一次 "\n".join
+    if out:
+        out.append("")
+    out.append(block)
+
+
+def _emit_list(out: List[str], header: str, items: Iterable[str]) -> None:
+    # 边迭代边写入 out，items 可直接传生成器；首项出现时才补标题
+    started = False
+    for item in items:
+        if started:
+            out.append(f"- {item}")
+            continue
+        _emit_block(out, header)
+        _emit_block(out, f"- {item}")
+        started = True
 
 
 def _normalize_paragraphs(value: object) -> List[str]:
     if isinstance(value, list):
-        return [str(v).strip() for v in value if str(v).strip()]
+        return _clean_strs(value)
     if isinstance(value, str):
         text = value.strip()
         if not text:
             return []
-        parts = re.split(r"\n\s*\n", text)
+        parts = _PARAGRAPH_SPLIT_RE.split(text)
         return [p.strip() for p in parts if p.strip()]
     return []
 
 
-def _get_section_enabled(specs: BranchSpecs, path: List[str], default: bool = True) -> bool:
-    node: object = specs.raw
-    for key in path:
-        if not isinstance(node, dict):
-            return default
-        node = node.get(key)
+def _get_section_enabled(specs: BranchSpecs, path: tuple[str, ...], default: bool = True) -> bool:
+    node = specs.flat.get(path)
     if isinstance(node, dict) and "enabled" in node:
         enabled = node.get("enabled")
         return bool(enabled)
@@ -67,12 +104,8 @@ def _get_section_enabled(specs: BranchSpecs, path: List[str], default: bool = Tr
     return default
 
 
-def _get_max_items(specs: BranchSpecs, path: List[str], default: int) -> int:
-    node: object = specs.raw
-    for key in path:
-        if not isinstance(node, dict):
-            return default
-        node = node.get(key)
+def _get_max_items(specs: BranchSpecs, path: tuple[str, ...], default: int) -> int:
+    node = specs.flat.get(path)
     if isinstance(node, dict):
         raw = node.get("max_items")
         if isinstance(raw, int):
@@ -87,85 +120,103 @@ def _get_max_items(specs: BranchSpecs, path: List[str], default: int) -> int:
 
 def _append_factcheck_status(sections: List[str], status: str | None) -> None:
     if status == "review":
-        sections.append("核验状态：待审")
+        _emit_block(sections, "核验状态：待审")
     elif status == "warn":
-        sections.append("核验状态：存疑")
+        _emit_block(sections, "核验状态：存疑")
 
 
-def build_branch1_output(
-    cluster: Dict,
+@functools.lru_cache(maxsize=64)
+def _split_topic_template(template: str) -> tuple[str, ...] | None:
+    # 只含 {topic_id} 占位的模板预先切分，渲染时直接 join；转义/格式说明等写法交回 str.format
+    parts = tuple(template.split("{topic_id}"))
+    if any("{" in part or "}" in part for part in parts):
+        return None
+    return parts
+
+
+def _format_topic_command(template: str, topic_id: object, topic_text: str) -> str:
+    parts = _split_topic_template(template) if isinstance(template, str) else None
+    if parts is None:
+        return template.format(topic_id=topic_id)
+    return topic_text.join(parts)
+
+
+def _append_feedback_commands(sections: List[str], specs: BranchSpecs, topic_id: object) -> None:
+    feedback_cfg = specs.raw.get("branch1", {}).get("feedback", {})
+    if not feedback_cfg.get("enabled", True):
+        return
+    commands = feedback_cfg.get("commands") or {}
+    useful = commands.get("useful", "👍 {topic_id}")
+    useless = commands.get("useless", "👎 {topic_id}")
+    skip = commands.get("skip", "⏭ {topic_id}")
+    if topic_id is not None:
+        # topic_id 只转一次字符串，三条指令共用
+        topic_text = str(topic_id)
+        _emit_block(sections, "反馈指令")
+        _emit_block(
+            sections,
+            f"{_format_topic_command(useful, topic_id, topic_text)} / "
+            f"{_format_topic_command(useless, topic_id, topic_text)} / "
+            f"{_format_topic_command(skip, topic_id, topic_text)}"
+        )
+
+
+def _build_branch1(
+    *,
+    title: str,
     brief: Dict,
+    primary_link: str,
+    evidence_links: List[str] | None,
     specs: BranchSpecs,
-    factcheck_status: str | None = None,
-    title_override: str | None = None,
+    factcheck_status: str | None,
+    topic_id: object,
+    next_watch_line: str,
 ) -> Dict:
-    title = title_override or cluster.get("title") or brief.get("title") or ""
+    # 新闻与 Repo 共用一套拼装；evidence_links 为 None 表示无证据链接（Repo），书签只放主链接
     one_liner = brief.get("one_liner") or ""
     why_matters = brief.get("why_matters") or []
     key_features = brief.get("key_features") or []
 
-    evidence_links = _normalize_links(cluster.get("evidence_links"))
-    primary_link = str(cluster.get("primary_link") or brief.get("url") or "").strip()
-
     sections: List[str] = []
     if title:
-        sections.append(f"**{title}**")
+        _emit_block(sections, f"**{title}**")
     if one_liner:
-        sections.append(one_liner)
+        _emit_block(sections, one_liner)
 
-    why_block = _format_list([str(v) for v in why_matters if str(v).strip()])
-    if why_block:
-        sections.append("为什么重要")
-        sections.append(why_block)
-
-    features_block = _format_list([str(v) for v in key_features if str(v).strip()])
-    if features_block:
-        sections.append("关键亮点")
-        sections.append(features_block)
+    _emit_list(sections, "为什么重要", (text for text in map(str, why_matters) if text.strip()))
+    _emit_list(sections, "关键亮点", (text for text in map(str, key_features) if text.strip()))
 
     if primary_link:
-        sections.append(f"主链接：{primary_link}")
-    if evidence_links:
-        sections.append("证据链接")
-        sections.append(_format_list(evidence_links[:5]))
+        _emit_block(sections, f"主链接：{primary_link}")
+    if evidence_links is not None:
+        _emit_list(sections, "证据链接", evidence_links[:5])
 
     _append_factcheck_status(sections, factcheck_status)
 
-    if _get_section_enabled(specs, ["branch1", "sections", "try_this_week"], True):
-        max_items = _get_max_items(specs, ["branch1", "sections", "try_this_week"], 3)
-        try_items = [str(v) for v in key_features if str(v).strip()][:max_items]
-        if try_items:
-            sections.append("Try This Week (<=30min)")
-            sections.append(_format_list([f"试试：{v}" for v in try_items]))
-
-    if _get_section_enabled(specs, ["branch1", "sections", "bookmark"], True):
-        max_items = _get_max_items(specs, ["branch1", "sections", "bookmark"], 5)
-        bookmarks = evidence_links[:max_items]
-        if primary_link and primary_link not in bookmarks:
-            bookmarks = [primary_link] + bookmarks
-        bookmarks = bookmarks[:max_items]
-        if bookmarks:
-            sections.append("Bookmark")
-            sections.append(_format_list(bookmarks))
-
-    if _get_section_enabled(specs, ["branch1", "sections", "next_watch"], True):
-        sections.append("Next Watch")
-        sections.append(_format_list(["出现官方公告/版本升级/安全通告时再次关注"]))
-
-    feedback_cfg = specs.raw.get("branch1", {}).get("feedback", {})
-    if feedback_cfg.get("enabled", True):
-        commands = feedback_cfg.get("commands") or {}
-        useful = commands.get("useful", "👍 {topic_id}")
-        useless = commands.get("useless", "👎 {topic_id}")
-        skip = commands.get("skip", "⏭ {topic_id}")
-        topic_id = cluster.get("id")
-        if topic_id is not None:
-            sections.append("反馈指令")
-            sections.append(
-                f"{useful.format(topic_id=topic_id)} / {useless.format(topic_id=topic_id)} / {skip.format(topic_id=topic_id)}"
-            )
-
-    content = "\n\n".join([s for s in sections if s])
+    if _get_section_enabled(specs, ("branch1", "sections", "try_this_week"), True):
+        max_items = _get_max_items(specs, ("branch1", "sections", "try_this_week"), 3)
+        try_items = [text for text in map(str, key_features) if text.strip()][:max_items]
+        _emit_list(sections, "Try This Week (<=30min)", (f"试试：{v}" for v in try_items))
+
+    if _get_section_enabled(specs, ("branch1", "sections", "bookmark"), True):
+        if evidence_links is None:
+            bookmarks = [primary_link] if primary_link else []
+        else:
+            max_items = _get_max_items(specs, ("branch1", "sections", "bookmark"), 5)
+            bookmarks = evidence_links[:max_items]
+            if primary_link and primary_link not in bookmarks:
+                bookmarks = [primary_link] + bookmarks
+            bookmarks = bookmarks[:max_items]
+        _emit_list(sections, "Bookmark", bookmarks)
+
+    if _get_section_enabled(specs, ("branch1", "sections", "next_watch"), True):
+        _emit_list(sections, "Next Watch", [next_watch_line])
+
+    _append_feedback_commands(sections, specs, topic_id)
+
+    content = "\n".join(sections)
+    if evidence_links is None:
+        evidence_links = [primary_link] if primary_link else []
     meta = {
         "primary_link": primary_link,
         "evidence_links": evidence_links,
@@ -176,37 +227,32 @@ def build_branch1_output(
     }
 
 
-def build_branch2_output(
-    cluster: Dict,
+def _build_branch2(
+    *,
+    title: str,
     brief: Dict,
+    primary_link: str,
+    evidence_links: List[str],
     specs: BranchSpecs,
     factcheck_status: str | None,
-    title_override: str | None = None,
 ) -> Dict:
-    title = title_override or cluster.get("title") or brief.get("title") or ""
     summary = brief.get("summary") or brief.get("one_liner") or ""
     body = _normalize_paragraphs(brief.get("body"))
     points = brief.get("points") or brief.get("key_features") or []
     quote_spans = brief.get("quote_spans") or []
 
-    primary_link = str(cluster.get("primary_link") or brief.get("url") or "").strip()
-    evidence_links = _normalize_links(cluster.get("evidence_links"))
-
     sections: List[str] = []
     if title:
-        sections.append(f"**{title}**")
+        _emit_block(sections, f"**{title}**")
     if summary:
-        sections.append(summary)
+        _emit_block(sections, summary)
 
-    if body:
-        sections.extend(body)
+    for paragraph in body:
+        _emit_block(sections, paragraph)
 
-    points_block = _format_list([str(v) for v in points if str(v).strip()])
-    if points_block:
-        sections.append("要点")
-        sections.append(points_block)
+    _emit_list(sections, "要点", (text for text in map(str, points) if text.strip()))
 
-    content = "\n\n".join([s for s in sections if s])
+    content = "\n".join(sections)
 
     quote_max: int = 120
     quote_cfg = specs.raw.get("branch2", {}).get("quoting", {})
@@ -245,10 +291,8 @@ def build_branch2_output(
     if isinstance(review_cfg, dict) and review_cfg.get("low_confidence_goes_to_review", True):
         review_required = factcheck_status == "review"
 
-    unique_links = []
-    for link in [primary_link] + evidence_links:
-        if link and link not in unique_links:
-            unique_links.append(link)
+    # dict 保持插入顺序，线性时间完成有序去重
+    unique_links = [link for link in dict.fromkeys([primary_link, *evidence_links]) if link]
 
     meta = {
         "attribution": unique_links[:5],
@@ -257,7 +301,7 @@ def build_branch2_output(
         "review_required": review_required,
         "summary": summary,
         "body": body,
-        "points": [str(v).strip() for v in points if str(v).strip()][:5],
+        "points": _clean_strs(points, limit=5),
         "primary_link": primary_link,
         "title": title,
     }
@@ -267,74 +311,58 @@ def build_branch2_output(
     }
 
 
-def build_branch1_repo_output(
-    repo: Dict,
+def build_branch1_output(
+    cluster: Dict,
     brief: Dict,
     specs: BranchSpecs,
+    factcheck_status: str | None = None,
     title_override: str | None = None,
 ) -> Dict:
-    title = title_override or repo.get("full_name") or brief.get("title") or ""
-    one_liner = brief.get("one_liner") or ""
-    why_matters = brief.get("why_matters") or []
-    key_features = brief.get("key_features") or []
-
-    primary_link = str(repo.get("url") or brief.get("url") or "").strip()
-    sections: List[str] = []
-    if title:
-        sections.append(f"**{title}**")
-    if one_liner:
-        sections.append(one_liner)
-
-    why_block = _format_list([str(v) for v in why_matters if str(v).strip()])
-    if why_block:
-        sections.append("为什么重要")
-        sections.append(why_block)
+    return _build_branch1(
+        title=title_override or cluster.get("title") or brief.get("title") or "",
+        brief=brief,
+        primary_link=str(cluster.get("primary_link") or brief.get("url") or "").strip(),
+        evidence_links=_normalize_links(cluster.get("evidence_links")),
+        specs=specs,
+        factcheck_status=factcheck_status,
+        topic_id=cluster.get("id"),
+        next_watch_line="出现官方公告/版本升级/安全通告时再次关注",
+    )
 
-    features_block = _format_list([str(v) for v in key_features if str(v).strip()])
-    if features_block:
-        sections.append("关键亮点")
-        sections.append(features_block)
 
-    if primary_link:
-        sections.append(f"主链接：{primary_link}")
-
-    if _get_section_enabled(specs, ["branch1", "sections", "try_this_week"], True):
-        max_items = _get_max_items(specs, ["branch1", "sections", "try_this_week"], 3)
-        try_items = [str(v) for v in key_features if str(v).strip()][:max_items]
-        if try_items:
-            sections.append("Try This Week (<=30min)")
-            sections.append(_format_list([f"试试：{v}" for v in try_items]))
-
-    if _get_section_enabled(specs, ["branch1", "sections", "bookmark"], True) and primary_link:
-        sections.append("Bookmark")
-        sections.append(_format_list([primary_link]))
+def build_branch2_output(
+    cluster: Dict,
+    brief: Dict,
+    specs: BranchSpecs,
+    factcheck_status: str | None,
+    title_override: str | None = None,
+) -> Dict:
+    return _build_branch2(
+        title=title_override or cluster.get("title") or brief.get("title") or "",
+        brief=brief,
+        primary_link=str(cluster.get("primary_link") or brief.get("url") or "").strip(),
+        evidence_links=_normalize_links(cluster.get("evidence_links")),
+        specs=specs,
+        factcheck_status=factcheck_status,
+    )
 
-    if _get_section_enabled(specs, ["branch1", "sections", "next_watch"], True):
-        sections.append("Next Watch")
-        sections.append(_format_list(["关注版本更新、星标增速或重大安全通告"]))
 
-    feedback_cfg = specs.raw.get("branch1", {}).get("feedback", {})
-    if feedback_cfg.get("enabled", True):
-        commands = feedback_cfg.get("commands") or {}
-        useful = commands.get("useful", "👍 {topic_id}")
-        useless = commands.get("useless", "👎 {topic_id}")
-        skip = commands.get("skip", "⏭ {topic_id}")
-        topic_id = repo.get("id")
-        if topic_id is not None:
-            sections.append("反馈指令")
-            sections.append(
-                f"{useful.format(topic_id=topic_id)} / {useless.format(topic_id=topic_id)} / {skip.format(topic_id=topic_id)}"
-            )
-
-    content = "\n\n".join([s for s in sections if s])
-    meta = {
-        "primary_link": primary_link,
-        "evidence_links": [primary_link] if primary_link else [],
-    }
-    return {
-        "content": content,
-        "meta": meta,
-    }
+def build_branch1_repo_output(
+    repo: Dict,
+    brief: Dict,
+    specs: BranchSpecs,
+    title_override: str | None = None,
+) -> Dict:
+    return _build_branch1(
+        title=title_override or repo.get("full_name") or brief.get("title") or "",
+        brief=brief,
+        primary_link=str(repo.get("url") or brief.get("url") or "").strip(),
+        evidence_links=None,
+        specs=specs,
+        factcheck_status=None,
+        topic_id=repo.get("id"),
+        next_watch_line="关注版本更新、星标增速或重大安全通告",
+    )
 
 
 def build_branch2_repo_output(
@@ -343,73 +371,12 @@ def build_branch2_repo_output(
     specs: BranchSpecs,
     title_override: str | None = None,
 ) -> Dict:
-    title = title_override or repo.get("full_name") or brief.get("title") or ""
-    summary = brief.get("summary") or brief.get("one_liner") or ""
-    body = _normalize_paragraphs(brief.get("body"))
-    points = brief.get("points") or brief.get("key_features") or []
-    quote_spans = brief.get("quote_spans") or []
-
-    primary_link = str(repo.get("url") or brief.get("url") or "").strip()
-    sections: List[str] = []
-    if title:
-        sections.append(f"**{title}**")
-    if summary:
-        sections.append(summary)
-
-    if body:
-        sections.extend(body)
-
-    points_block = _format_list([str(v) for v in points if str(v).strip()])
-    if points_block:
-        sections.append("要点")
-        sections.append(points_block)
-
-    content = "\n\n".join([s for s in sections if s])
-
-    quote_max = 120
-    quote_cfg = specs.raw.get("branch2", {}).get("quoting", {})
-    if isinstance(quote_cfg, dict):
-        raw = quote_cfg.get("max_quote_len")
-        if isinstance(raw, int):
-            quote_max = raw
-        elif isinstance(raw, str):
-            try:
-                quote_max = int(raw)
-            except Exception:
-                quote_max = 120
-
-    quote_texts: List[str] = []
-    if isinstance(quote_spans, list) and quote_spans:
-        for sentence in quote_spans:
-            if len(quote_texts) >= 3:
-                break
-            text = str(sentence).strip()
-            if not text:
-                continue
-            if len(text) > quote_max:
-                text = text[:quote_max].rstrip() + "..."
-            quote_texts.append(text)
-    else:
-        candidate_text = _strip_markdown(summary)
-        for sentence in _split_sentences(candidate_text):
-            if len(quote_texts) >= 3:
-                break
-            if len(sentence) > quote_max:
-                sentence = sentence[:quote_max].rstrip() + "..."
-            quote_texts.append(sentence)
-
-    meta = {
-        "attribution": [primary_link] if primary_link else [],
-        "quote_spans": quote_texts,
-        "factcheck_status": None,
-        "review_required": False,
-        "summary": summary,
-        "body": body,
-        "points": [str(v).strip() for v in points if str(v).strip()][:5],
-        "primary_link": primary_link,
-        "title": title,
-    }
-    return {
-        "content": content,
-        "meta": meta,
-    }
+    # Repo 无证据链接与核验结果，归因只剩主链接、review_required 恒为 False
+    return _build_branch2(
+        title=title_override or repo.get("full_name") or brief.get("title") or "",
+        brief=brief,
+        primary_link=str(repo.get("url") or brief.get("url") or "").strip(),
+        evidence_links=[],
+        specs=specs,
+        factcheck_status=None,
+    )
@@ -3,13 +3,13 @@ from __future__ import annotations
 import json
 from typing import Dict, List
 
-from .branch_specs import load_branch_specs
+from .branch_specs import BranchSpecs, load_branch_specs
 from .config import Settings
 
 
 def _normalize_list(value) -> List[str]:
     if isinstance(value, list):
-        return [str(v).strip() for v in value if str(v).strip()]
+        return [text for text in (str(v).strip() for v in value) if text]
     if isinstance(value, str):
         v = value.strip()
         return [v] if v else []
@@ -24,16 +24,8 @@ def _build_branch1_action_items(key_features: List[str], max_items: int) -> List
 
 
 def _build_branch1_bookmarks(primary_link: str, evidence_links: List[str], max_items: int) -> List[str]:
-    bookmarks: List[str] = []
-    if primary_link:
-        bookmarks.append(primary_link)
-    for link in evidence_links:
-        if link in bookmarks:
-            continue
-        bookmarks.append(link)
-        if len(bookmarks) >= max_items:
-            break
-    return bookmarks
+    links = [primary_link, *evidence_links] if primary_link else evidence_links
+    return list(dict.fromkeys(links))[:max_items]
 
 
 def _build_branch1_next_watch(max_items: int) -> List[str]:
@@ -46,11 +38,19 @@ def _build_branch1_next_watch(max_items: int) -> List[str]:
     return signals[:max_items]
 
 
-def build_branch1_output(settings: Settings, brief: Dict, cluster: Dict, factcheck_meta: Dict | None) -> Dict:
-    specs = load_branch_specs(settings.branch_specs_file)
-    branch_cfg = specs.raw.get("branch1") or {}
-    if not branch_cfg.get("enabled", True):
+def build_branch1_output(
+    settings: Settings,
+    brief: Dict,
+    cluster: Dict,
+    factcheck_meta: Dict | None,
+    specs: BranchSpecs | None = None,
+) -> Dict:
+    # 批量构建时可由调用方预先加载一次 specs 传入，省去逐条检查配置文件
+    if specs is None:
+        specs = load_branch_specs(settings.branch_specs_file)
+    if not specs.branch_enabled("branch1"):
         return {}
+    branch_cfg = specs.raw.get("branch1") or {}
 
     sections = branch_cfg.get("sections") or {}
     try_cfg = sections.get("try_this_week") or {}
@@ -120,11 +120,18 @@ def build_branch1_output(settings: Settings, brief: Dict, cluster: Dict, factche
     }
 
 
-def build_branch2_output(settings: Settings, brief: Dict, cluster: Dict, factcheck_meta: Dict | None) -> Dict:
-    specs = load_branch_specs(settings.branch_specs_file)
-    branch_cfg = specs.raw.get("branch2") or {}
-    if not branch_cfg.get("enabled", True):
+def build_branch2_output(
+    settings: Settings,
+    brief: Dict,
+    cluster: Dict,
+    factcheck_meta: Dict | None,
+    specs: BranchSpecs | None = None,
+) -> Dict:
+    if specs is None:
+        specs = load_branch_specs(settings.branch_specs_file)
+    if not specs.branch_enabled("branch2"):
         return {}
+    branch_cfg = specs.raw.get("branch2") or {}
 
     review_cfg = branch_cfg.get("review") or {}
     low_conf_review = review_cfg.get("low_confidence_goes_to_review", True)
@@ -164,12 +171,7 @@ def build_branch2_output(settings: Settings, brief: Dict, cluster: Dict, factche
 
     content = "\n".join(lines).strip()
 
-    attribution: List[str] = []
-    if primary_link:
-        attribution.append(primary_link)
-    for link in evidence_links:
-        if link not in attribution:
-            attribution.append(link)
+    attribution = list(dict.fromkeys([primary_link, *evidence_links] if primary_link else evidence_links))
 
     review_required = False
     if low_conf_review and factcheck_meta:
@@ -1,3 +1,5 @@
+import concurrent.futures
+import functools
 import json
 
 import lark_oapi as lark
@@ -5,6 +7,17 @@ from lark_oapi.api.im.v1 import CreateMessageRequest, CreateMessageRequestBody
 
 from ..config import Settings
 
+# 卡片固定部分只构建一次，按卡片只替换正文与按钮回传值（仅用于序列化，勿原地修改）
+_CARD_CONFIG = {"wide_screen_mode": True}
+_CARD_HEADER = {
+    "title": {"tag": "plain_text", "content": "🚀 AI Briefing · AI1"},
+    "template": "blue",
+}
+_BUTTON_TEMPLATES = (
+    ("primary", {"tag": "plain_text", "content": "👍 有用"}, "useful"),
+    ("danger", {"tag": "plain_text", "content": "👎 没用"}, "useless"),
+    ("default", {"tag": "plain_text", "content": "⚠️ 纠错"}, "correct"),
+)
 
 
 def _get_chat_id(settings: Settings) -> str:
@@ -17,10 +30,16 @@ def _get_chat_id(settings: Settings) -> str:
 def _get_client(settings: Settings) -> lark.Client:
     if not settings.feishu_app_id or not settings.feishu_app_secret:
         raise RuntimeError("FEISHU_APP_ID/FEISHU_APP_SECRET missing.")
+    return _build_client(settings.feishu_app_id, settings.feishu_app_secret)
+
+
+@functools.lru_cache(maxsize=4)
+def _build_client(app_id: str, app_secret: str) -> lark.Client:
+    # 按凭证缓存客户端：多条消息复用同一 HTTP 连接池与 tenant_access_token
     return (
         lark.Client.builder()
-        .app_id(settings.feishu_app_id)
-        .app_secret(settings.feishu_app_secret)
+        .app_id(app_id)
+        .app_secret(app_secret)
         .log_level(lark.LogLevel.ERROR)
         .build()
     )
@@ -33,7 +52,7 @@ def _send_message(settings: Settings, msg_type: str, content: dict[str, object])
         CreateMessageRequestBody.builder()
         .receive_id(chat_id)
         .msg_type(msg_type)
-        .content(json.dumps(content, ensure_ascii=False))
+        .content(json.dumps(content, ensure_ascii=False, separators=(",", ":")))
         .build()
     )
     req = (
@@ -78,29 +97,15 @@ def build_output_card(
     actions = [
         {
             "tag": "button",
-            "type": "primary",
-            "text": {"tag": "plain_text", "content": "👍 有用"},
-            "value": _build_action_value(output_id, topic_kind, topic_ref_id, "useful"),
-        },
-        {
-            "tag": "button",
-            "type": "danger",
-            "text": {"tag": "plain_text", "content": "👎 没用"},
-            "value": _build_action_value(output_id, topic_kind, topic_ref_id, "useless"),
-        },
-        {
-            "tag": "button",
-            "type": "default",
-            "text": {"tag": "plain_text", "content": "⚠️ 纠错"},
-            "value": _build_action_value(output_id, topic_kind, topic_ref_id, "correct"),
-        },
+            "type": button_type,
+            "text": text,
+            "value": _build_action_value(output_id, topic_kind, topic_ref_id, label),
+        }
+        for button_type, text, label in _BUTTON_TEMPLATES
     ]
     return {
-        "config": {"wide_screen_mode": True},
-        "header": {
-            "title": {"tag": "plain_text", "content": "🚀 AI Briefing · AI1"},
-            "template": "blue",
-        },
+        "config": _CARD_CONFIG,
+        "header": _CARD_HEADER,
         "elements": [
             {"tag": "markdown", "content": safe_content},
             {"tag": "action", "actions": actions},
@@ -117,3 +122,18 @@ def send_output_card(
 ) -> None:
     card = build_output_card(output_id, content, topic_kind, topic_ref_id)
     _send_message(settings, "interactive", card)
+
+
+def send_output_cards(
+    settings: Settings,
+    items: list[tuple[int, str, str | None, int | None]],
+) -> None:
+    cards = [build_output_card(*item) for item in items]
+    workers = max(1, min(settings.feishu_push_max_workers, len(cards)))
+    if workers == 1:
+        for card in cards:
+            _send_message(settings, "interactive", card)
+        return
+    # 并发发送复用同一缓存客户端；list() 消费结果，任一卡片失败即抛出由调用方回滚
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(lambda card: _send_message(settings, "interactive", card), cards))
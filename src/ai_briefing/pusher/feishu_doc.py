@@ -1,36 +1,125 @@
 from __future__ import annotations
 
+import concurrent.futures
 import json
 import os
 import re
+import threading
+import time
 from datetime import datetime
+from typing import Callable
 from zoneinfo import ZoneInfo
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from ..config import Settings
 
+try:
+    import orjson
+except ImportError:  # orjson 为可选依赖，缺失时退回标准库
+    orjson = None
+
+try:
+    from requests_toolbelt.multipart.encoder import MultipartEncoder
+except ImportError:  # requests_toolbelt 为可选依赖，缺失时由 requests 在内存中拼装 multipart
+    MultipartEncoder = None
+
+_json_loads = orjson.loads if orjson is not None else json.loads
+
+
+def _build_session() -> requests.Session:
+    # 一篇文档要连续调用十余次 open.feishu.cn，共用连接池复用 TCP/TLS 连接
+    # Retry 默认不重试 POST，建文档/块等非幂等请求不会被重复提交
+    retry = Retry(total=3, backoff_factor=1, status_forcelist=[429, 500, 502, 503, 504], raise_on_status=False)
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=20, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    return session
+
+
+_HTTP_SESSION = _build_session()
+
+_PARAGRAPH_SPLIT_RE = re.compile(r"\n\s*\n")
+
+# 飞书创建子块接口单次最多 50 个
+APPEND_BLOCKS_BATCH_SIZE = 50
+IMAGE_UPLOAD_MAX_WORKERS = 4
+
+# 提前刷新余量（秒），避免 token 在请求途中过期
+TOKEN_REFRESH_MARGIN_SECONDS = 300
+# tenant_access_token 无效/过期的错误码
+_INVALID_TOKEN_CODES = frozenset({99991663, 99991668, 99991677})
+
+# (app_id, app_secret) -> (token, 失效时刻 monotonic)
+_token_cache: dict[tuple[str, str], tuple[str, float]] = {}
+_token_lock = threading.Lock()
+
 
 def get_tenant_access_token(settings: Settings) -> str:
     if not settings.feishu_app_id or not settings.feishu_app_secret:
         raise RuntimeError("FEISHU_APP_ID/FEISHU_APP_SECRET missing.")
-    resp = requests.post(
-        "https://open.feishu.cn/open-apis/auth/v3/tenant_access_token/internal",
-        json={
-            "app_id": settings.feishu_app_id,
-            "app_secret": settings.feishu_app_secret,
-        },
-        timeout=30,
-    )
-    if resp.status_code >= 400:
-        raise RuntimeError(f"Feishu auth HTTP {resp.status_code}: {resp.text}")
-    data = resp.json()
-    if data.get("code") not in (0, "0"):
-        raise RuntimeError(f"Feishu auth error: {data}")
-    token = data.get("tenant_access_token")
-    if not token:
-        raise RuntimeError("Feishu auth token missing")
-    return token
+    key = (settings.feishu_app_id, settings.feishu_app_secret)
+    # 持锁请求：并发线程同时过期时只换取一次 token
+    with _token_lock:
+        cached = _token_cache.get(key)
+        if cached is not None and time.monotonic() < cached[1]:
+            return cached[0]
+        resp = _HTTP_SESSION.post(
+            "https://open.feishu.cn/open-apis/auth/v3/tenant_access_token/internal",
+            json={
+                "app_id": settings.feishu_app_id,
+                "app_secret": settings.feishu_app_secret,
+            },
+            timeout=30,
+        )
+        if resp.status_code >= 400:
+            raise RuntimeError(f"Feishu auth HTTP {resp.status_code}: {resp.text}")
+        data = _json_loads(resp.content)
+        if data.get("code") not in (0, "0"):
+            raise RuntimeError(f"Feishu auth error: {data}")
+        token = data.get("tenant_access_token")
+        if not token:
+            raise RuntimeError("Feishu auth token missing")
+        expire = int(data.get("expire") or 7200)
+        _token_cache[key] = (token, time.monotonic() + expire - TOKEN_REFRESH_MARGIN_SECONDS)
+        return token
+
+
+def _invalidate_tenant_access_token(settings: Settings, token: str) -> None:
+    key = (settings.feishu_app_id or "", settings.feishu_app_secret or "")
+    with _token_lock:
+        cached = _token_cache.get(key)
+        # 只清掉被拒的那个 token，其他线程可能已换到新的
+        if cached is not None and cached[0] == token:
+            del _token_cache[key]
+
+
+def _is_invalid_token_response(resp: requests.Response) -> bool:
+    if resp.status_code < 400:
+        return False
+    try:
+        data = _json_loads(resp.content)
+    except ValueError:
+        return False
+    return isinstance(data, dict) and data.get("code") in _INVALID_TOKEN_CODES
+
+
+def _send_with_token(
+    settings: Settings,
+    send: Callable[[dict[str, str]], requests.Response],
+) -> requests.Response:
+    """带缓存 token 发送请求；token 被提前作废（如重置密钥）时清缓存重取并重发一次。
+
+    send 接收鉴权头并完成一次请求，重发时会被再次调用（上传需在其中重新打开文件）。
+    """
+    token = get_tenant_access_token(settings)
+    resp = send({"Authorization": f"Bearer {token}"})
+    if _is_invalid_token_response(resp):
+        _invalidate_tenant_access_token(settings, token)
+        resp = send({"Authorization": f"Bearer {get_tenant_access_token(settings)}"})
+    return resp
 
 
 def _get_beijing_date_str(settings: Settings) -> str:
@@ -39,38 +128,34 @@ def _get_beijing_date_str(settings: Settings) -> str:
 
 
 def _list_files_in_folder(settings: Settings, parent_token: str) -> list[dict]:
-    token = get_tenant_access_token(settings)
-    headers = {"Authorization": f"Bearer {token}"}
-    resp = requests.get(
+    resp = _send_with_token(settings, lambda headers: _HTTP_SESSION.get(
         "https://open.feishu.cn/open-apis/drive/v1/files",
         headers=headers,
         params={"folder_token": parent_token, "page_size": 200},
         timeout=30,
-    )
+    ))
     if resp.status_code >= 400:
         raise RuntimeError(f"Feishu list files HTTP {resp.status_code}: {resp.text}")
-    data = resp.json()
+    data = _json_loads(resp.content)
     if data.get("code") not in (0, "0"):
         raise RuntimeError(f"Feishu list files error: {data}")
     return data.get("data", {}).get("files", []) or data.get("data", {}).get("items", []) or []
 
 
 def _create_folder(settings: Settings, parent_token: str, name: str) -> str:
-    token = get_tenant_access_token(settings)
-    headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
     payload = {
         "name": name,
         "folder_token": parent_token,
     }
-    resp = requests.post(
+    resp = _send_with_token(settings, lambda headers: _HTTP_SESSION.post(
         "https://open.feishu.cn/open-apis/drive/v1/files/create_folder",
-        headers=headers,
+        headers={**headers, "Content-Type": "application/json"},
         json=payload,
         timeout=30,
-    )
+    ))
     if resp.status_code >= 400:
         raise RuntimeError(f"Feishu create folder HTTP {resp.status_code}: {resp.text}")
-    data = resp.json()
+    data = _json_loads(resp.content)
     if data.get("code") not in (0, "0"):
         raise RuntimeError(f"Feishu create folder error: {data}")
     token_value = data.get("data", {}).get("token") or data.get("data", {}).get("folder_token")
@@ -79,6 +164,11 @@ def _create_folder(settings: Settings, parent_token: str, name: str) -> str:
     return token_value
 
 
+# (父文件夹, 日期名) -> 当日文件夹 token；持锁查找/创建，并发建文档时不会重复建文件夹
+_daily_folder_cache: dict[tuple[str, str], str] = {}
+_daily_folder_lock = threading.Lock()
+
+
 def get_or_create_daily_folder_token(settings: Settings) -> str | None:
     if not settings.feishu_doc_folder_token:
         return None
@@ -86,36 +176,53 @@ def get_or_create_daily_folder_token(settings: Settings) -> str | None:
         return settings.feishu_doc_folder_token
 
     date_name = _get_beijing_date_str(settings)
-    files = _list_files_in_folder(settings, settings.feishu_doc_folder_token)
-    for item in files:
-        name = item.get("name") or item.get("title")
-        file_type = item.get("type") or item.get("file_type") or ""
-        token_value = item.get("token") or item.get("folder_token")
-        if name == date_name and token_value and str(file_type) in ("folder", "docx_folder", "folder"):
-            return token_value
-
-    return _create_folder(settings, settings.feishu_doc_folder_token, date_name)
+    key = (settings.feishu_doc_folder_token, date_name)
+    with _daily_folder_lock:
+        cached = _daily_folder_cache.get(key)
+        if cached:
+            return cached
+        folder_token = None
+        files = _list_files_in_folder(settings, settings.feishu_doc_folder_token)
+        for item in files:
+            name = item.get("name") or item.get("title")
+            file_type = item.get("type") or item.get("file_type") or ""
+            token_value = item.get("token") or item.get("folder_token")
+            if name == date_name and token_value and str(file_type) in ("folder", "docx_folder", "folder"):
+                folder_token = token_value
+                break
+        if not folder_token:
+            folder_token = _create_folder(settings, settings.feishu_doc_folder_token, date_name)
+        _daily_folder_cache[key] = folder_token
+        return folder_token
+
+
+def _forget_daily_folder(folder_token: str | None) -> None:
+    with _daily_folder_lock:
+        for key, cached in list(_daily_folder_cache.items()):
+            if cached == folder_token:
+                del _daily_folder_cache[key]
 
 
 def create_doc(settings: Settings, title: str) -> tuple[str, str]:
-    token = get_tenant_access_token(settings)
-    headers = {"Authorization": f"Bearer {token}"}
     payload = {
         "title": title,
     }
     folder_token = get_or_create_daily_folder_token(settings)
     if folder_token:
         payload["folder_token"] = folder_token
-    resp = requests.post(
+    resp = _send_with_token(settings, lambda headers: _HTTP_SESSION.post(
         "https://open.feishu.cn/open-apis/docx/v1/documents",
         headers=headers,
         json=payload,
         timeout=30,
-    )
+    ))
+    # 建文档失败时当日文件夹可能已被手动删除，丢弃缓存以便下次重新查找
     if resp.status_code >= 400:
+        _forget_daily_folder(folder_token)
         raise RuntimeError(f"Feishu create doc HTTP {resp.status_code}: {resp.text}")
-    data = resp.json()
+    data = _json_loads(resp.content)
     if data.get("code") not in (0, "0"):
+        _forget_daily_folder(folder_token)
         raise RuntimeError(f"Feishu create doc error: {data}")
     doc_id = data.get("data", {}).get("document", {}).get("document_id")
     doc_url = data.get("data", {}).get("document", {}).get("url")
@@ -127,16 +234,14 @@ def create_doc(settings: Settings, title: str) -> tuple[str, str]:
 
 
 def get_document_root_block_id(settings: Settings, doc_id: str) -> str:
-    token = get_tenant_access_token(settings)
-    headers = {"Authorization": f"Bearer {token}"}
-    resp = requests.get(
+    resp = _send_with_token(settings, lambda headers: _HTTP_SESSION.get(
         f"https://open.feishu.cn/open-apis/docx/v1/documents/{doc_id}/blocks",
         headers=headers,
         timeout=30,
-    )
+    ))
     if resp.status_code >= 400:
         raise RuntimeError(f"Feishu get blocks HTTP {resp.status_code}: {resp.text}")
-    data = resp.json()
+    data = _json_loads(resp.content)
     if data.get("code") not in (0, "0"):
         raise RuntimeError(f"Feishu get blocks error: {data}")
     items = data.get("data", {}).get("items", [])
@@ -161,14 +266,24 @@ def _paragraph_block(text: str) -> dict:
     }
 
 
+def _clean_strs(values: list) -> list[str]:
+    # 每项只做一次 str()+strip()，丢弃空白项
+    out: list[str] = []
+    for v in values:
+        text = str(v).strip()
+        if text:
+            out.append(text)
+    return out
+
+
 def _normalize_paragraphs(value: object) -> list[str]:
     if isinstance(value, list):
-        return [str(v).strip() for v in value if str(v).strip()]
+        return _clean_strs(value)
     if isinstance(value, str):
         text = value.strip()
         if not text:
             return []
-        parts = re.split(r"\n\s*\n", text)
+        parts = _PARAGRAPH_SPLIT_RE.split(text)
         return [p.strip() for p in parts if p.strip()]
     return []
 
@@ -182,20 +297,19 @@ def _local_image_block(file_path: str) -> dict:
     }
 
 
-def create_image_block(settings: Settings, doc_id: str) -> str:
-    token = get_tenant_access_token(settings)
-    headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
-    root_block_id = get_document_root_block_id(settings, doc_id)
+def create_image_block(settings: Settings, doc_id: str, root_block_id: str | None = None) -> str:
+    if root_block_id is None:
+        root_block_id = get_document_root_block_id(settings, doc_id)
     payload = {"children": [{"block_type": 27, "image": {}}]}
-    resp = requests.post(
+    resp = _send_with_token(settings, lambda headers: _HTTP_SESSION.post(
         f"https://open.feishu.cn/open-apis/docx/v1/documents/{doc_id}/blocks/{root_block_id}/children",
-        headers=headers,
+        headers={**headers, "Content-Type": "application/json"},
         json=payload,
         timeout=30,
-    )
+    ))
     if resp.status_code >= 400:
         raise RuntimeError(f"Feishu create image block HTTP {resp.status_code}: {resp.text}")
-    data = resp.json()
+    data = _json_loads(resp.content)
     if data.get("code") not in (0, "0"):
         raise RuntimeError(f"Feishu create image block error: {data}")
     children = data.get("data", {}).get("children", [])
@@ -210,28 +324,39 @@ def create_image_block(settings: Settings, doc_id: str) -> str:
 def upload_docx_image(settings: Settings, image_block_id: str, file_path: str) -> str:
     if not os.path.exists(file_path):
         raise RuntimeError(f"image not found: {file_path}")
-    token = get_tenant_access_token(settings)
-    headers = {"Authorization": f"Bearer {token}"}
     file_name = os.path.basename(file_path)
     file_size = os.path.getsize(file_path)
-    with open(file_path, "rb") as f:
-        files = {"file": (file_name, f)}
-        data = {
-            "file_name": file_name,
-            "parent_type": settings.image_docx_parent_type,
-            "parent_node": image_block_id,
-            "size": str(file_size),
-        }
-        resp = requests.post(
-            "https://open.feishu.cn/open-apis/drive/v1/medias/upload_all",
-            headers=headers,
-            data=data,
-            files=files,
-            timeout=60,
-        )
+    form = {
+        "file_name": file_name,
+        "parent_type": settings.image_docx_parent_type,
+        "parent_node": image_block_id,
+        "size": str(file_size),
+    }
+
+    def _send(headers: dict[str, str]) -> requests.Response:
+        # 每次发送重新打开文件，token 失效重发时不会传出空文件
+        with open(file_path, "rb") as f:
+            if MultipartEncoder is not None:
+                # 流式发送 multipart，大图不会整份拷贝进内存
+                encoder = MultipartEncoder(fields={**form, "file": (file_name, f, "application/octet-stream")})
+                return _HTTP_SESSION.post(
+                    "https://open.feishu.cn/open-apis/drive/v1/medias/upload_all",
+                    headers={**headers, "Content-Type": encoder.content_type},
+                    data=encoder,
+                    timeout=60,
+                )
+            return _HTTP_SESSION.post(
+                "https://open.feishu.cn/open-apis/drive/v1/medias/upload_all",
+                headers=headers,
+                data=form,
+                files={"file": (file_name, f)},
+                timeout=60,
+            )
+
+    resp = _send_with_token(settings, _send)
     if resp.status_code >= 400:
         raise RuntimeError(f"Feishu upload image HTTP {resp.status_code}: {resp.text}")
-    data = resp.json()
+    data = _json_loads(resp.content)
     if data.get("code") not in (0, "0"):
         raise RuntimeError(f"Feishu upload image error: {data}")
     file_token = data.get("data", {}).get("file_token")
@@ -241,46 +366,51 @@ def upload_docx_image(settings: Settings, image_block_id: str, file_path: str) -
 
 
 def update_image_block(settings: Settings, doc_id: str, block_id: str, file_token: str) -> None:
-    token = get_tenant_access_token(settings)
-    headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
     payload = {"replace_image": {"token": file_token}}
-    resp = requests.patch(
+    resp = _send_with_token(settings, lambda headers: _HTTP_SESSION.patch(
         f"https://open.feishu.cn/open-apis/docx/v1/documents/{doc_id}/blocks/{block_id}",
-        headers=headers,
+        headers={**headers, "Content-Type": "application/json"},
         json=payload,
         timeout=30,
-    )
+    ))
     if resp.status_code >= 400:
         raise RuntimeError(f"Feishu update image block HTTP {resp.status_code}: {resp.text}")
-    data = resp.json()
+    data = _json_loads(resp.content)
     if data.get("code") not in (0, "0"):
         raise RuntimeError(f"Feishu update image block error: {data}")
 
 
-def _append_blocks_raw(settings: Settings, doc_id: str, blocks: list[dict]) -> None:
-    token = get_tenant_access_token(settings)
-    headers = {"Authorization": f"Bearer {token}"}
+def _append_blocks_raw(
+    settings: Settings,
+    doc_id: str,
+    blocks: list[dict],
+    root_block_id: str | None = None,
+) -> list[dict]:
     if not blocks:
-        return
-    root_block_id = get_document_root_block_id(settings, doc_id)
+        return []
+    if root_block_id is None:
+        root_block_id = get_document_root_block_id(settings, doc_id)
     payload = {"children": blocks}
-    resp = requests.post(
+    resp = _send_with_token(settings, lambda headers: _HTTP_SESSION.post(
         f"https://open.feishu.cn/open-apis/docx/v1/documents/{doc_id}/blocks/{root_block_id}/children",
         headers=headers,
         json=payload,
         timeout=30,
-    )
+    ))
     if resp.status_code >= 400:
         raise RuntimeError(f"Feishu append blocks HTTP {resp.status_code}: {resp.text}")
-    data = resp.json()
+    data = _json_loads(resp.content)
     if data.get("code") not in (0, "0"):
         raise RuntimeError(f"Feishu append blocks error: {data}")
+    children = data.get("data", {}).get("children", [])
+    return children if isinstance(children, list) else []
 
 
 def append_blocks(settings: Settings, doc_id: str, blocks: list[dict]) -> None:
     if not blocks:
         return
-    pending: list[dict] = []
+    children: list[dict] = []
+    image_paths: dict[int, str] = {}
     for block in blocks:
         if not isinstance(block, dict):
             continue
@@ -288,26 +418,55 @@ def append_blocks(settings: Settings, doc_id: str, blocks: list[dict]) -> None:
             image = block.get("image") or {}
             file_path = image.get("local_path")
             if file_path:
-                if pending:
-                    _append_blocks_raw(settings, doc_id, pending)
-                    pending = []
-                image_block_id = create_image_block(settings, doc_id)
-                file_token = upload_docx_image(settings, image_block_id, file_path)
-                update_image_block(settings, doc_id, image_block_id, file_token)
+                # 图片先以空图片块占位，与文本块按原顺序同批创建
+                image_paths[len(children)] = file_path
+                children.append({"block_type": 27, "image": {}})
                 continue
-        pending.append(block)
-    if pending:
-        _append_blocks_raw(settings, doc_id, pending)
+        children.append(block)
+    if not children:
+        return
+
+    # 根块 id 整篇文档只查一次；单次最多创建 APPEND_BLOCKS_BATCH_SIZE 个子块
+    root_block_id = get_document_root_block_id(settings, doc_id)
+    created: list[dict] = []
+    for start in range(0, len(children), APPEND_BLOCKS_BATCH_SIZE):
+        batch = children[start:start + APPEND_BLOCKS_BATCH_SIZE]
+        created.extend(_append_blocks_raw(settings, doc_id, batch, root_block_id))
+    if not image_paths:
+        return
+    if len(created) != len(children):
+        raise RuntimeError(f"Feishu append blocks returned {len(created)} children, expected {len(children)}")
+
+    uploads: list[tuple[str, str]] = []
+    for idx, file_path in image_paths.items():
+        block_id = created[idx].get("block_id") if isinstance(created[idx], dict) else None
+        if not block_id:
+            raise RuntimeError(f"Feishu append blocks missing image block_id: {created[idx]}")
+        uploads.append((block_id, file_path))
+
+    def _fill_image(upload: tuple[str, str]) -> None:
+        image_block_id, file_path = upload
+        file_token = upload_docx_image(settings, image_block_id, file_path)
+        update_image_block(settings, doc_id, image_block_id, file_token)
+
+    if len(uploads) == 1:
+        _fill_image(uploads[0])
+        return
+    # 各图片上传互不依赖，并发执行；任一失败即抛出
+    with concurrent.futures.ThreadPoolExecutor(max_workers=min(len(uploads), IMAGE_UPLOAD_MAX_WORKERS)) as executor:
+        list(executor.map(_fill_image, uploads))
 
 
 def build_doc_blocks(settings: Settings, title: str, meta: dict) -> list[dict]:
     blocks: list[dict] = []
-    summary = meta.get("summary") if isinstance(meta, dict) else None
-    body = meta.get("body") if isinstance(meta, dict) else None
-    points = meta.get("points") if isinstance(meta, dict) else None
-    quote_spans = meta.get("quote_spans") if isinstance(meta, dict) else None
-    attribution = meta.get("attribution") if isinstance(meta, dict) else None
-    images = meta.get("images") if isinstance(meta, dict) else None
+    if not isinstance(meta, dict):
+        meta = {}
+    summary = meta.get("summary")
+    body = meta.get("body")
+    points = meta.get("points")
+    quote_spans = meta.get("quote_spans")
+    attribution = meta.get("attribution")
+    images = meta.get("images")
 
     if summary:
         blocks.append(_paragraph_block(str(summary)))
@@ -354,3 +513,19 @@ def build_doc_blocks(settings: Settings, title: str, meta: dict) -> list[dict]:
                 blocks.append(_paragraph_block(f"- {text}"))
 
     return blocks
+
+
+def publish_doc(settings: Settings, title: str, meta: dict) -> str:
+    doc_id, doc_url = create_doc(settings, title)
+    append_blocks(settings, doc_id, build_doc_blocks(settings, title, meta))
+    return doc_url
+
+
+def publish_docs(settings: Settings, docs: list[tuple[str, dict]]) -> list[str]:
+    """按顺序返回每篇 (title, meta) 的文档链接；FEISHU_PUSH_MAX_WORKERS>1 时多篇并发创建。"""
+    workers = max(1, min(settings.feishu_push_max_workers, len(docs)))
+    if workers == 1:
+        return [publish_doc(settings, title, meta) for title, meta in docs]
+    # 每篇文档十余次串行 HTTP 调用，线程在网络等待时释放 GIL；map 保持顺序，任一失败即抛出
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(lambda doc: publish_doc(settings, doc[0], doc[1]), docs))
@@ -1,59 +1,101 @@
+import concurrent.futures
 import json
+
+from psycopg.types.json import Jsonb
+
 from ..db import get_conn
 from ..config import Settings
-from .feishu import send_text, send_output_card
-from .feishu_doc import create_doc, append_blocks, build_doc_blocks
+from .feishu import send_text, send_output_cards
+from .feishu_doc import publish_docs
+
+try:
+    import orjson
+except ImportError:  # orjson 为可选依赖，缺失时退回标准库
+    orjson = None
+
+_json_loads = orjson.loads if orjson is not None else json.loads
+
+def _clean_strs(values: list) -> list[str]:
+    # 每项只做一次 str()+strip()，丢弃空白项
+    out: list[str] = []
+    for v in values:
+        text = str(v).strip()
+        if text:
+            out.append(text)
+    return out
 
 def _parse_list(value):
     if value is None:
         return []
     if isinstance(value, list):
-        return [str(v).strip() for v in value if str(v).strip()]
+        return _clean_strs(value)
     if isinstance(value, str):
         text = value.strip()
         if not text:
             return []
         try:
-            parsed = json.loads(text)
+            parsed = _json_loads(text)
             if isinstance(parsed, list):
-                return [str(v).strip() for v in parsed if str(v).strip()]
+                return _clean_strs(parsed)
         except Exception:
             return [text]
     return []
 
 def _split_messages(header: str, blocks: list[str], max_chars: int) -> list[str]:
     messages = []
-    current = header
+    # 当前消息以片段列表累积、只记长度，落盘时 join 一次，避免每追加一块都复制整条消息
+    base_parts = [header] if header else []
+    parts = list(base_parts)
+    length = len(header)
     for block in blocks:
         block_text = block.strip()
         if not block_text:
             continue
-        candidate = f"{current}\n\n{block_text}" if current else block_text
-        if len(candidate) <= max_chars:
-            current = candidate
+        added = len(block_text) + 2 if length else len(block_text)
+        if length + added <= max_chars:
+            parts.append(block_text)
+            length += added
             continue
-        if current:
-            messages.append(current)
-            current = header
-        candidate = f"{current}\n\n{block_text}" if current else block_text
-        if len(candidate) <= max_chars:
-            current = candidate
+        if length:
+            messages.append("\n\n".join(parts))
+            parts = list(base_parts)
+            length = len(header)
+        added = len(block_text) + 2 if length else len(block_text)
+        if length + added <= max_chars:
+            parts.append(block_text)
+            length += added
         else:
             # 单条过长时进行截断
             trimmed = block_text[:max_chars - len(header) - 2]
             if header:
-                current = f"{header}\n\n{trimmed}"
+                messages.append(f"{header}\n\n{trimmed}")
             else:
-                current = trimmed
-            messages.append(current)
-            current = header
-    if current and current != header:
-        messages.append(current)
+                messages.append(trimmed)
+            parts = list(base_parts)
+            length = len(header)
+    if len(parts) > len(base_parts):
+        messages.append("\n\n".join(parts))
     if not messages and header:
         messages.append(header)
     return messages
 
 
+def _mark_branch1_sent(cur, branch1_ids: list[int]) -> None:
+    if branch1_ids:
+        cur.execute(
+            "UPDATE outputs SET status = 'sent' WHERE id = ANY(%s) AND branch = 'branch1'",
+            (branch1_ids,),
+        )
+
+    cur.execute(
+        """
+        INSERT INTO publish_log(channel, payload, status, created_at)
+        VALUES ('feishu', %s, 'success', NOW())
+        """,
+        (Jsonb({"output_ids": branch1_ids}),),
+    )
+
+
 def _extract_title(content: str) -> str:
     if not content:
         return "公众号稿"
@@ -109,7 +151,7 @@ def push_pending_outputs(settings: Settings):
                         meta_obj = {}
                         if isinstance(meta, str):
                             try:
-                                meta_obj = json.loads(meta)
+                                meta_obj = _json_loads(meta)
                             except Exception:
                                 meta_obj = {}
                         elif isinstance(meta, dict):
@@ -118,16 +160,29 @@ def push_pending_outputs(settings: Settings):
                         title = str(meta_title).strip() if meta_title else _extract_title(content)
                         branch2_docs.append((oid, content, meta_obj, title))
 
+                card_items = [
+                    (item["id"], item["content"], item.get("topic_kind"), item.get("topic_ref_id"))
+                    for item in branch1_outputs
+                ]
+                card_future = None
+                if card_items and branch2_docs and settings.feishu_push_max_workers > 1:
+                    # 文档不发群消息，卡片可与建文档并行，两段网络等待互相重叠
+                    print(f"准备推送 {len(card_items)} 条卡片")
+                    card_executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+                    card_future = card_executor.submit(send_output_cards, settings, card_items)
+                    card_executor.shutdown(wait=False)
+
                 try:
-                    doc_payloads = []
-                    for oid, content, meta_obj, title in branch2_docs:
-                        doc_id, doc_url = create_doc(settings, title)
-                        blocks = build_doc_blocks(settings, title, meta_obj)
-                        append_blocks(settings, doc_id, blocks)
-                        doc_payloads.append({"output_id": oid, "doc_url": doc_url})
-                        cur.execute(
+                    doc_urls = publish_docs(settings, [(title, meta_obj) for _, _, meta_obj, title in branch2_docs])
+                    doc_payloads = [
+                        {"output_id": oid, "doc_url": doc_url}
+                        for (oid, _, _, _), doc_url in zip(branch2_docs, doc_urls)
+                    ]
+                    if doc_payloads:
+                        # 数据库游标不跨线程，状态更新在主线程用一次 executemany 写入（psycopg 自动走 pipeline）
+                        cur.executemany(
                             "UPDATE outputs SET status = 'sent', meta = jsonb_set(COALESCE(meta, '{}'::jsonb), '{doc_url}', %s, true) WHERE id = %s",
-                            (json.dumps(doc_url), oid),
+                            [(Jsonb(p["doc_url"]), p["output_id"]) for p in doc_payloads],
                         )
 
                     cur.execute(
@@ -135,7 +190,7 @@ def push_pending_outputs(settings: Settings):
                         INSERT INTO publish_log(channel, payload, status, created_at)
                         VALUES ('feishu', %s, 'success', NOW())
                         """,
-                        (json.dumps({"docs": doc_payloads}, ensure_ascii=False),),
+                        (Jsonb({"docs": doc_payloads}),),
                     )
 
                     conn.commit()
@@ -144,33 +199,26 @@ def push_pending_outputs(settings: Settings):
                 except Exception as e:
                     conn.rollback()
                     print(f"Failed to push outputs batch: {e}")
+                    if card_future is not None:
+                        card_error = card_future.exception()
+                        if card_error is None:
+                            # 卡片已并行发出，先记为已发送，避免下次重复推送
+                            _mark_branch1_sent(cur, branch1_ids)
+                            conn.commit()
+                        else:
+                            # 随后重新抛出的是文档异常，卡片异常需在此记录
+                            print(f"Failed to push branch1 outputs batch: {card_error}")
                     raise
 
-                if branch1_outputs:
+                if card_items:
                     try:
-                        for idx, item in enumerate(branch1_outputs, start=1):
-                            print(f"准备推送第 {idx}/{len(branch1_outputs)} 条卡片")
-                            send_output_card(
-                                settings,
-                                item["id"],
-                                item["content"],
-                                item.get("topic_kind"),
-                                item.get("topic_ref_id"),
-                            )
-
-                        if branch1_ids:
-                            cur.execute(
-                                "UPDATE outputs SET status = 'sent' WHERE id = ANY(%s) AND branch = 'branch1'",
-                                (branch1_ids,),
-                            )
-
-                        cur.execute(
-                            """
-                            INSERT INTO publish_log(channel, payload, status, created_at)
-                            VALUES ('feishu', %s, 'success', NOW())
-                            """,
-                            (json.dumps({"output_ids": branch1_ids}, ensure_ascii=False),),
-                        )
+                        if card_future is not None:
+                            card_future.result()
+                        else:
+                            print(f"准备推送 {len(card_items)} 条卡片")
+                            send_output_cards(settings, card_items)
+
+                        _mark_branch1_sent(cur, branch1_ids)
                         conn.commit()
                         print(f"Successfully pushed batch of {len(branch1_ids)} outputs.")
                     except Exception as e:
@@ -276,7 +324,7 @@ def push_pending_briefs(settings: Settings):
                     cur.execute("""
                         INSERT INTO push_log(channel, payload, status, created_at)
                         VALUES ('feishu', %s, 'success', NOW())
-                    """, (json.dumps({"texts": messages}),))
+                    """, (Jsonb({"texts": messages}),))
                     
                     conn.commit()
                     print(f"Successfully pushed batch of {len(brief_ids)} briefs.")
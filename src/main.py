@@ -89,25 +89,25 @@ def run_github(settings: Settings):
             return
 
         logger.info("Generating Repo Briefs...")
+        specs = load_branch_specs(settings.branch_specs_file)
+        branch1_enabled = specs.branch_enabled("branch1")
+        branch2_enabled = specs.branch_enabled("branch2")
         briefs_data = generator.generate_repo_briefs(settings, repoCandidates)
-        branch2_briefs = generator.generate_repo_briefs_branch2(settings, repoCandidates)
+        # Branch2 关闭时不再为其调用 LLM
+        branch2_briefs = generator.generate_repo_briefs_branch2(settings, repoCandidates) if branch2_enabled else []
         branch2_by_id = {b["source_id"]: b for b in branch2_briefs}
         repo_by_id = {repo['id']: repo for repo in repoCandidates}
         
-        specs = load_branch_specs(settings.branch_specs_file)
+        # 生成期间可能已有其他进程写入，写入前统一复查一次
+        recentRepoIds = getRecentBriefRefIds(settings, "repo", [b['source_id'] for b in briefs_data], settings.brief_dedup_hours)
         # 写入 Repo 简报
         with get_conn(settings) as conn:
             with conn.cursor() as cur:
                 new_saved = 0
                 for b in briefs_data:
                     # 去重检查
-                    if settings.brief_dedup_hours > 0:
-                        cur.execute(
-                            "SELECT id FROM briefs WHERE kind='repo' AND ref_id=%s AND created_at > NOW() - (%s || ' hours')::interval",
-                            (str(b['source_id']), settings.brief_dedup_hours)
-                        )
-                        if cur.fetchone():
-                            continue
+                    if int(b['source_id']) in recentRepoIds:
+                        continue
 
                     repo_info = repo_by_id.get(b['source_id'], {})
                     title = build_repo_title(
@@ -135,12 +135,12 @@ def run_github(settings: Settings):
                     output_payloads = []
                     branch2_brief = None
                     branch2_content = None
-                    if specs.raw.get("branch1", {}).get("enabled", True):
+                    if branch1_enabled:
                         output_payloads.append((
                             "branch1",
                             build_branch1_repo_output(repo_info, b['content'], specs, title_override=title),
                         ))
-                    if specs.raw.get("branch2", {}).get("enabled", True):
+                    if branch2_enabled:
                         branch2_brief = branch2_by_id.get(b['source_id'])
                         if branch2_brief:
                             branch2_content = branch2_brief['content']
@@ -238,10 +238,15 @@ def run_rss(settings: Settings, collect_only: bool = False, brief_only: bool = F
                 logger.error(f"Factcheck 失败: {e}")
 
             logger.info("Generating News Briefs...")
+            specs = load_branch_specs(settings.branch_specs_file)
+            branch1_enabled = specs.branch_enabled("branch1")
+            branch2_enabled = specs.branch_enabled("branch2")
             news_briefs = generator.generate_news_briefs(settings, clusterCandidates)
-            branch2_news_briefs = generator.generate_news_briefs_branch2(settings, clusterCandidates)
+            # Branch2 关闭时不再为其调用 LLM
+            branch2_news_briefs = generator.generate_news_briefs_branch2(settings, clusterCandidates) if branch2_enabled else []
             branch2_news_by_id = {b["source_id"]: b for b in branch2_news_briefs}
-            specs = load_branch_specs(settings.branch_specs_file)
+            # 生成期间可能已有其他进程写入，写入前统一复查一次
+            recentNewsIds = getRecentBriefRefIds(settings, "news", [b['source_id'] for b in news_briefs], settings.brief_dedup_hours)
             
             # 写入新闻简报
             with get_conn(settings) as conn:
@@ -249,13 +254,8 @@ def run_rss(settings: Settings, collect_only: bool = False, brief_only: bool = F
                     new_saved = 0
                     for b in news_briefs:
                         # 去重检查
-                        if settings.brief_dedup_hours > 0:
-                            cur.execute(
-                                "SELECT id FROM briefs WHERE kind='news' AND ref_id=%s AND created_at > NOW() - (%s || ' hours')::interval",
-                                (str(b['source_id']), settings.brief_dedup_hours)
-                            )
-                            if cur.fetchone():
-                                continue
+                        if int(b['source_id']) in recentNewsIds:
+                            continue
 
                         cluster_info = cluster_by_id.get(b['source_id'], {})
                         title = build_news_title(
@@ -288,12 +288,12 @@ def run_rss(settings: Settings, collect_only: bool = False, brief_only: bool = F
                         branch2_news_content = None
                         cluster_for_output = dict(cluster_info)
                         cluster_for_output["title"] = title
-                        if specs.raw.get("branch1", {}).get("enabled", True):
+                        if branch1_enabled:
                             output_payloads.append((
                                 "branch1",
                                 build_branch1_output(cluster_for_output, b['content'], specs, factcheck_status, title_override=title),
                             ))
-                        if specs.raw.get("branch2", {}).get("enabled", True):
+                        if branch2_enabled:
                             branch2_news_brief = branch2_news_by_id.get(b['source_id'])
                             if branch2_news_brief:
                                 branch2_news_content = branch2_news_brief['content']
@@ -161,16 +161,21 @@ def main() -> None:
         raise SystemExit(f"缺少必填环境变量: {', '.join(missing)}")
 
     _check_database_url()
+    _check_int_env("DB_POOL_MAX_SIZE", "4")
 
     _check_int_env("LLM_TIMEOUT_SECONDS", "60")
     _check_int_env("LLM_MAX_WORKERS", "1")
     _check_int_env("LLM_RETRY_MAX", "1")
     _check_int_env("LLM_RETRY_BACKOFF_SECONDS", "2")
+    _check_int_env("LLM_RATE_LIMIT_RPM", "0")
+    _check_int_env("LLM_CACHE_MAX_SIZE", "1000")
+    _check_int_env("FEISHU_PUSH_MAX_WORKERS", "1")
 
     _check_bool_env("LLM_CACHE_ENABLED", "true")
     _check_bool_env("FEISHU_GROUP_BY_KIND", "true")
     _check_bool_env("GLM_ENABLE_THINKING", "false")
     _check_bool_env("X_ENABLED", "true")
+    _check_bool_env("GRAPHVIZ_INPROCESS", "false")
 
     _check_llm_providers()
 
@@ -51,6 +51,11 @@ EXPECTED_TABLES: dict[str, list[str]] = {
         "status",
         "created_at",
     ],
+    "feed_cache": [
+        "etag",
+        "last_modified",
+        "last_fetched_at",
+    ],
     "user_feedback": [
         "topic_kind",
         "topic_ref_id",
@@ -77,26 +82,26 @@ def _get_columns(cur, table_name: str) -> set[str]:
 
 
 def check_schema():
-    conn = get_conn(get_settings())
-    with conn.cursor() as cur:
-        failed: list[str] = []
+    with get_conn(get_settings()) as conn:
+        with conn.cursor() as cur:
+            failed: list[str] = []
 
-        for table_name, expected_cols in EXPECTED_TABLES.items():
-            cols = _get_columns(cur, table_name)
-            if not cols:
-                failed.append(f"missing table: {table_name}")
-                continue
-            for col in expected_cols:
-                if col not in cols:
-                    failed.append(f"missing column: {table_name}.{col}")
+            for table_name, expected_cols in EXPECTED_TABLES.items():
+                cols = _get_columns(cur, table_name)
+                if not cols:
+                    failed.append(f"missing table: {table_name}")
+                    continue
+                for col in expected_cols:
+                    if col not in cols:
+                        failed.append(f"missing column: {table_name}.{col}")
 
-        if failed:
-            print("SCHEMA FAIL")
-            for line in failed:
-                print(line)
-            raise SystemExit(2)
+            if failed:
+                print("SCHEMA FAIL")
+                for line in failed:
+                    print(line)
+                raise SystemExit(2)
 
-        print("SCHEMA OK")
+            print("SCHEMA OK")
 
 if __name__ == "__main__":
     check_schema()
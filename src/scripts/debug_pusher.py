@@ -12,12 +12,12 @@ logger = logging.getLogger("debug_pusher")
 
 def debug():
     settings = get_settings()
-    conn = get_conn(settings)
-    with conn.cursor() as cur:
-        # Check pending
-        cur.execute("SELECT count(*) FROM briefs WHERE sent_at IS NULL")
-        pending = cur.fetchone()[0]
-        logger.info(f"Pending briefs: {pending}")
+    with get_conn(settings) as conn:
+        with conn.cursor() as cur:
+            # Check pending
+            cur.execute("SELECT count(*) FROM briefs WHERE sent_at IS NULL")
+            pending = cur.fetchone()[0]
+            logger.info(f"Pending briefs: {pending}")
         
     logger.info("Running pusher...")
     try:
@@ -126,15 +126,11 @@ def main() -> None:
 
     load_dotenv("/opt/ai_briefing/.env")
     settings = get_settings()
-    conn = get_conn(settings)
-    try:
-        with conn:
-            with conn.cursor() as cur:
-                for stmt in MIGRATIONS:
-                    cur.execute(stmt)
-        print("MIGRATION OK")
-    finally:
-        conn.close()
+    with get_conn(settings) as conn:
+        with conn.cursor() as cur:
+            for stmt in MIGRATIONS:
+                cur.execute(stmt)
+    print("MIGRATION OK")
 
 
 if __name__ == "__main__":